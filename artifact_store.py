@@ -0,0 +1,188 @@
+# artifact_store.py
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from disk_cache import DiskCache
+
+try:
+    import fcntl
+except ImportError:  # Windows: stage locks are skipped
+    fcntl = None
+
+ARTIFACT_STORE = os.getenv('ARTIFACT_STORE', 'on').lower() != 'off'
+ARTIFACT_DIR = os.getenv('ARTIFACT_DIR', os.path.join('.cache', 'artifacts'))
+ARTIFACT_RECORDS_MAX_MB = int(os.getenv('ARTIFACT_RECORDS_MAX_MB', '64'))
+# After each run the least recently used artifacts are removed until the store fits this;
+# stages that pointed to them simply run again
+ARTIFACT_MAX_MB = int(os.getenv('ARTIFACT_MAX_MB', '4096'))
+# Artifacts used more recently than this are never pruned, so runs sharing the store (such as
+# job workers) keep what they have looked up until they are done with it
+ARTIFACT_PRUNE_GRACE_HOURS = float(os.getenv('ARTIFACT_PRUNE_GRACE_HOURS', '24'))
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ArtifactStore:
+    """Content-addressed artifacts plus a record of which stage inputs produced which outputs.
+
+    objects/  artifacts, named by the sha256 of their content
+    stages/   one JSON record per stage key (see stage_key)
+    work/     persistent scratch directories, so an interrupted stage can pick up where it stopped
+    locks/    one lock file per stage key, held while that stage runs
+    """
+
+    def __init__(self, directory=ARTIFACT_DIR, records_max_bytes=ARTIFACT_RECORDS_MAX_MB * 1024 * 1024,
+                 max_bytes=ARTIFACT_MAX_MB * 1024 * 1024, grace_seconds=ARTIFACT_PRUNE_GRACE_HOURS * 3600):
+        self.directory = directory
+        self.records = DiskCache(os.path.join(directory, 'stages'), records_max_bytes)
+        self.max_bytes = max_bytes
+        self.grace_seconds = grace_seconds
+
+    def path(self, digest):
+        return os.path.join(self.directory, 'objects', digest[:2], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def touch(self, digest):
+        """Marks an artifact as recently used; False if it is gone"""
+        try:
+            os.utime(self.path(digest))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _store(self, digest, write):
+        path = self.path(digest)
+        if self.touch(digest):
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write next to the target and rename, so a crash never leaves a truncated artifact behind
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(temp_path, path)
+        return digest
+
+    def put_bytes(self, data):
+        return self._store(sha256_bytes(data), lambda f: f.write(data))
+
+    def put_text(self, text):
+        return self.put_bytes(text.encode('utf-8'))
+
+    def put_file(self, source_path):
+        def copy(f):
+            with open(source_path, 'rb') as source:
+                shutil.copyfileobj(source, f)
+        return self._store(sha256_file(source_path), copy)
+
+    def get_text(self, digest):
+        with open(self.path(digest), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def stage_key(self, name, version, params, inputs):
+        """Hashes a stage's identity, parameters and the digests of everything it consumes"""
+        payload = json.dumps({"stage": name, "version": version, "params": params, "inputs": inputs},
+                             sort_keys=True)
+        return sha256_bytes(payload.encode('utf-8'))
+
+    def lookup(self, key):
+        """Returns the stage record if every artifact it points to is still present"""
+        record = self.records.get(key)
+        if record is None or not all([self.touch(digest) for digest in iter_digests(record["outputs"])]):
+            return None
+        return record
+
+    def record(self, key, name, outputs, seconds):
+        self.records.put(key, {"stage": name, "outputs": outputs, "seconds": seconds, "created_at": time.time()})
+
+    def objects(self):
+        for root, _, files in os.walk(os.path.join(self.directory, 'objects')):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def prune(self, max_bytes=None):
+        """Removes the least recently used artifacts until the store fits max_bytes; returns how many.
+
+        Artifacts used within the grace period are kept even if the store stays over max_bytes.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        objects = sorted(self.objects(), key=lambda entry: entry[2])
+        size = sum(size for _, size, _ in objects)
+        cutoff = time.time() - self.grace_seconds
+        removed = 0
+        for path, object_size, used_at in objects:
+            if size <= max_bytes or used_at > cutoff:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= object_size
+            removed += 1
+        return removed
+
+    def stage_lock(self, key):
+        return StageLock(os.path.join(self.directory, 'locks', f"{key}.lock"))
+
+    def work_dir(self, key):
+        path = os.path.join(self.directory, 'work', key)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def clear_work_dir(self, key):
+        shutil.rmtree(os.path.join(self.directory, 'work', key), ignore_errors=True)
+
+class StageLock:
+    """Exclusive, non-blocking lock on one stage key, shared across processes through a lock file.
+
+    Two runs with identical inputs would otherwise share the stage's work directory, and one
+    run clearing it would delete the other's files mid-run.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, 'a')
+
+    def acquire(self):
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self.file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    def release(self):
+        # Closing the file drops the lock
+        self.file.close()
+
+def content_digests(outputs):
+    """The '*_digest(s)' entries of stage outputs, which is all a downstream stage key depends on"""
+    return {name: value for name, value in outputs.items() if name.endswith(('_digest', '_digests'))}
+
+def iter_digests(outputs):
+    """Stage outputs are JSON values whose strings under '*_digest(s)' keys name artifacts"""
+    for name, value in outputs.items():
+        if name.endswith('_digest'):
+            yield value
+        elif name.endswith('_digests'):
+            yield from value
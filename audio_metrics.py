@@ -0,0 +1,129 @@
+# audio_metrics.py
+
+import json
+import os
+import threading
+
+AUDIO_METRICS_SINK = os.getenv('AUDIO_METRICS_SINK', 'memory')
+
+class MetricsSink:
+    """Collects one record per synthesized turn. Subclasses also persist the records."""
+
+    def __init__(self):
+        self.records = []
+        self.lock = threading.Lock()
+
+    def record(self, metrics):
+        with self.lock:
+            self.records.append(metrics)
+            self.write(metrics)
+
+    def write(self, metrics):
+        pass
+
+    def close(self):
+        pass
+
+class InMemoryMetricsSink(MetricsSink):
+    pass
+
+class JsonlMetricsSink(MetricsSink):
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def write(self, metrics):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(metrics) + "\n")
+
+class PrometheusTextSink(MetricsSink):
+    """Writes the records as Prometheus text exposition format when closed"""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def close(self):
+        totals = {}
+        for record in self.records:
+            voice = totals.setdefault(record["voice"], {
+                "turns": 0, "chunks": 0, "bytes": 0, "audio_seconds": 0.0, "retries": 0,
+                "first_chunk_sum": 0.0, "first_chunk_count": 0, "turn_complete_sum": 0.0,
+            })
+            voice["turns"] += 1
+            voice["chunks"] += record["chunks"]
+            voice["bytes"] += record["bytes"]
+            voice["audio_seconds"] += record["audio_seconds"]
+            voice["retries"] += record["retries"]
+            voice["turn_complete_sum"] += record["time_to_turn_complete"]
+            if record["time_to_first_chunk"] is not None:
+                voice["first_chunk_sum"] += record["time_to_first_chunk"]
+                voice["first_chunk_count"] += 1
+
+        metrics = [
+            ("audio_turns_total", "counter", "Synthesized turns", "turns"),
+            ("audio_chunks_total", "counter", "Audio chunks received", "chunks"),
+            ("audio_bytes_received_total", "counter", "PCM bytes received", "bytes"),
+            ("audio_seconds_produced_total", "counter", "Seconds of audio produced", "audio_seconds"),
+            ("audio_turn_retries_total", "counter", "Reconnects before turns completed", "retries"),
+            ("audio_time_to_turn_complete_seconds_sum", "counter", "Total send-to-turnComplete time", "turn_complete_sum"),
+            ("audio_time_to_first_chunk_seconds_sum", "counter", "Total send-to-first-chunk time", "first_chunk_sum"),
+            ("audio_time_to_first_chunk_seconds_count", "counter", "Turns that produced a first chunk", "first_chunk_count"),
+        ]
+        lines = []
+        for name, metric_type, help_text, key in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for voice, values in sorted(totals.items()):
+                lines.append(f'{name}{{voice="{voice}"}} {values[key]}')
+
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+
+def create_metrics_sink(spec=AUDIO_METRICS_SINK):
+    """Builds a sink from a spec such as 'memory', 'jsonl:metrics.jsonl' or 'prometheus:metrics.prom'"""
+    kind, _, path = spec.partition(':')
+    if kind == 'jsonl':
+        return JsonlMetricsSink(path or 'audio_metrics.jsonl')
+    if kind == 'prometheus':
+        return PrometheusTextSink(path or 'audio_metrics.prom')
+    if kind == 'memory':
+        return InMemoryMetricsSink()
+    raise ValueError(f"Unknown metrics sink: {spec}")
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+def summarize_metrics(records):
+    first_chunk = [r["time_to_first_chunk"] for r in records if r["time_to_first_chunk"] is not None]
+    turn_complete = [r["time_to_turn_complete"] for r in records]
+    audio_seconds = sum(r["audio_seconds"] for r in records)
+    return {
+        "turns": len(records),
+        "chunks": sum(r["chunks"] for r in records),
+        "bytes": sum(r["bytes"] for r in records),
+        "audio_seconds": audio_seconds,
+        "turn_seconds": sum(turn_complete),
+        "real_time_factor": sum(turn_complete) / audio_seconds if audio_seconds else None,
+        "first_chunk_p50": percentile(first_chunk, 0.5),
+        "first_chunk_p95": percentile(first_chunk, 0.95),
+        "turn_complete_p50": percentile(turn_complete, 0.5),
+        "turn_complete_p95": percentile(turn_complete, 0.95),
+        "retries": sum(r["retries"] for r in records),
+    }
+
+def print_metrics_summary(records):
+    if not records:
+        return
+    summary = summarize_metrics(records)
+    print("\nAudio metrics:")
+    print(f"  Turns: {summary['turns']}, chunks: {summary['chunks']}, bytes received: {summary['bytes']}")
+    print(f"  Audio produced: {summary['audio_seconds']:.1f}s in {summary['turn_seconds']:.1f}s of turn time"
+          + (f" (RTF {summary['real_time_factor']:.3f})" if summary['real_time_factor'] else ""))
+    if summary['first_chunk_p50'] is not None:
+        print(f"  Time to first chunk: p50 {summary['first_chunk_p50']:.2f}s, p95 {summary['first_chunk_p95']:.2f}s")
+    print(f"  Time to turnComplete: p50 {summary['turn_complete_p50']:.2f}s, p95 {summary['turn_complete_p95']:.2f}s")
+    print(f"  Retries: {summary['retries']}")
@@ -2,12 +2,13 @@
 
 import asyncio
 import base64
+import contextlib
 import json
 import os
+import time
 import wave
 from websockets.asyncio.client import connect
 import websockets
-import pyaudio
 from dotenv import load_dotenv
 import sys
 
@@ -21,14 +22,21 @@ if sys.version_info < (3, 11):
     asyncio.ExceptionGroup = exceptiongroup.ExceptionGroup
 
 class AudioGenerator:
-    def __init__(self, voice):
+    def __init__(self, voice, metrics_sink=None, turn_limiter=None):
         self.voice = voice
+        self.metrics_sink = metrics_sink
+        # Shared by every session of a multi-language render; each turn holds it while in flight
+        self.turn_limiter = turn_limiter
+        self.turn_metrics = None
+        self.retries = 0
+        # Retries already attributed to a recorded turn, so each turn only reports the reconnects before it
+        self.reported_retries = 0
         self.audio_in_queue = asyncio.Queue()
         self.ws = None
         self.ws_semaphore = asyncio.Semaphore(1)
 
         # Audio configuration
-        self.FORMAT = pyaudio.paInt16
+        self.SAMPLE_WIDTH = 2  # 16-bit PCM
         self.CHANNELS = 2
         self.SAMPLE_RATE = 24000
         self.CHUNK_SIZE = 512
@@ -44,6 +52,8 @@ class AudioGenerator:
         self.host = 'generativelanguage.googleapis.com'
         self.model = "gemini-2.0-flash-exp"
         self.uri = f"wss://{self.host}/ws/google.ai.generativelanguage.v1alpha.GenerativeService.BidiGenerateContent?key={GOOGLE_API_KEY}"
+        # Points the generator at another endpoint, e.g. mock_live_server.py for offline benchmarks
+        self.uri = os.getenv('LIVE_API_URI') or self.uri
 
         self.complete_audio = bytearray()
 
@@ -93,6 +103,44 @@ class AudioGenerator:
                 }
             }
             await ws.send(json.dumps(msg))
+            self.turn_metrics = {
+                "voice": self.voice,
+                "text_chars": len(text),
+                "sent_at": time.time(),
+                "sent_perf": time.perf_counter(),
+                "first_chunk_perf": None,
+                "chunks": 0,
+                "bytes": 0,
+            }
+
+    def record_chunk(self, pcm_data):
+        if self.turn_metrics is None:
+            return
+        if self.turn_metrics["first_chunk_perf"] is None:
+            self.turn_metrics["first_chunk_perf"] = time.perf_counter()
+        self.turn_metrics["chunks"] += 1
+        self.turn_metrics["bytes"] += len(pcm_data)
+
+    def record_turn_complete(self, output_file):
+        if self.turn_metrics is None or self.metrics_sink is None:
+            return
+        metrics = self.turn_metrics
+        sent = metrics.pop("sent_perf")
+        first_chunk = metrics.pop("first_chunk_perf")
+        elapsed = time.perf_counter() - sent
+        # The API streams mono 16-bit PCM
+        audio_seconds = metrics["bytes"] / self.SAMPLE_WIDTH / self.SAMPLE_RATE
+        metrics.update({
+            "output_file": os.path.basename(output_file),
+            "time_to_first_chunk": first_chunk - sent if first_chunk is not None else None,
+            "time_to_turn_complete": elapsed,
+            "audio_seconds": audio_seconds,
+            "real_time_factor": elapsed / audio_seconds if audio_seconds else None,
+            "retries": self.retries - self.reported_retries,
+        })
+        self.reported_retries = self.retries
+        self.metrics_sink.record(metrics)
+        self.turn_metrics = None
 
     async def receive_audio(self, output_file):
         async with self.ws_semaphore:
@@ -110,12 +158,14 @@ class AudioGenerator:
                                 b64data = part["inlineData"]["data"]
                                 pcm_data = base64.b64decode(b64data)
                                 self.complete_audio.extend(pcm_data)
+                                self.record_chunk(pcm_data)
                                 self.audio_in_queue.put_nowait(pcm_data)
                     except KeyError:
                         pass
 
                     try:
                         if response["serverContent"].get("turnComplete", False):
+                            self.record_turn_complete(output_file)
                             self.save_wav_file(output_file)
                             while not self.audio_in_queue.empty():
                                 self.audio_in_queue.get_nowait()
@@ -127,10 +177,15 @@ class AudioGenerator:
                 print(f"Connection closed: {e}")
                 raise
 
+    async def synthesize_turn(self, text, output_file):
+        async with self.turn_limiter or contextlib.nullcontext():
+            await self.send_text(self.ws, text)
+            await self.receive_audio(output_file)
+
     def save_wav_file(self, filename):
         with wave.open(filename, 'wb') as wav_file:
             wav_file.setnchannels(self.CHANNELS)
-            wav_file.setsampwidth(2)
+            wav_file.setsampwidth(self.SAMPLE_WIDTH)
             wav_file.setframerate(self.SAMPLE_RATE)
             stereo_data = bytearray()
             for i in range(0, len(self.complete_audio), 2):
@@ -142,21 +197,51 @@ class AudioGenerator:
 
     async def run(self, dialogues, output_files, max_retries=3):
         last_exception = None
+        completed = 0
         for attempt in range(max_retries):
             try:
                 ws = await connect(self.uri, **self.ws_options)
                 async with ws:
                     self.ws = ws
                     await self.startup(self.ws, self.voice)
-                    for dialogue, output_file in zip(dialogues, output_files):
-                        await self.send_text(self.ws, dialogue)
-                        await self.receive_audio(output_file)
+                    # The first dialogue primes the session, so it is always re-sent before resuming
+                    turn_indices = [0] + list(range(max(completed, 1), len(dialogues)))
+                    for i in turn_indices:
+                        await self.synthesize_turn(dialogues[i], output_files[i])
+                        completed = max(completed, i + 1)
                 return
             except websockets.exceptions.ConnectionClosedError as e:
                 last_exception = e
+                self.retries += 1
                 if attempt < max_retries - 1:
                     print(f"Connection lost. Retrying in 5 seconds... (Attempt {attempt + 1}/{max_retries})")
                     await asyncio.sleep(5)
                 else:
                     print("Max retries reached. Unable to reconnect.")
                     raise last_exception
+
+    async def run_queue(self, priming, priming_file, queue, max_retries=3):
+        """Primes a session, then synthesizes (dialogue, output_file) items from the queue until it yields None"""
+        pending = None
+        while True:
+            try:
+                ws = await connect(self.uri, **self.ws_options)
+                async with ws:
+                    self.ws = ws
+                    await self.startup(self.ws, self.voice)
+                    await self.synthesize_turn(priming, priming_file)
+                    while True:
+                        if pending is None:
+                            pending = await queue.get()
+                            if pending is None:
+                                return
+                        dialogue, output_file = pending
+                        await self.synthesize_turn(dialogue, output_file)
+                        pending = None
+            except websockets.exceptions.ConnectionClosedError as e:
+                self.retries += 1
+                if self.retries >= max_retries:
+                    print("Max retries reached. Unable to reconnect.")
+                    raise
+                print(f"Connection lost. Retrying in 5 seconds... (Attempt {self.retries}/{max_retries})")
+                await asyncio.sleep(5)
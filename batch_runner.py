@@ -0,0 +1,177 @@
+# batch_runner.py
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import generate_audio
+import generate_script
+import pipeline
+import script_translation
+from pipeline import PipelineConfig
+from audio_metrics import create_metrics_sink, summarize_metrics
+
+DEFAULT_LANGUAGE = 'English'
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Produce several podcast episodes unattended from a manifest.")
+    parser.add_argument('manifest', help='YAML, JSON or JSONL file describing the episodes')
+    parser.add_argument('--output-dir', default='batch_output', help='One sub-directory per episode is created here')
+    parser.add_argument('--workers', type=int, default=4, help='Episodes in flight at the same time')
+    parser.add_argument('--ingest-concurrency', type=int, default=4)
+    parser.add_argument('--script-concurrency', type=int, default=2)
+    parser.add_argument('--audio-concurrency', type=int, default=2)
+    return parser.parse_args()
+
+def load_manifest(path):
+    """Returns the list of episode dicts from a YAML, JSON or JSONL manifest"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    if path.endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("PyYAML is required for YAML manifests: pip install PyYAML")
+        data = yaml.safe_load(text)
+    elif path.endswith('.jsonl'):
+        data = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        data = json.loads(text)
+
+    episodes = data.get('episodes', []) if isinstance(data, dict) else data
+    return [normalize_episode(episode, i) for i, episode in enumerate(episodes)]
+
+def normalize_episode(episode, index):
+    voices = episode.get('voices', {})
+    sources = episode.get('sources')
+    if not sources:
+        raise ValueError(f"Episode {index} has no sources")
+    script_mode = episode.get('script_mode', generate_script.SCRIPT_MODE)
+    if script_mode not in generate_script.SCRIPT_MODES:
+        raise ValueError(f"Episode {index} has unknown script_mode {script_mode!r} "
+                         f"(expected one of {', '.join(generate_script.SCRIPT_MODES)})")
+    return {
+        "id": str(episode.get('id', f"episode-{index + 1}")),
+        "sources": [sources] if isinstance(sources, (str, dict)) else sources,
+        "language": episode.get('language', DEFAULT_LANGUAGE),
+        "voice_a": voices.get('a', episode.get('voice_a', generate_audio.VOICE_A)),
+        "voice_b": voices.get('b', episode.get('voice_b', generate_audio.VOICE_B)),
+        "script_mode": script_mode,
+        "pretranslate": bool(episode.get('pretranslate', script_translation.PRETRANSLATE)),
+    }
+
+def episode_config(episode, metrics_sink=None):
+    return PipelineConfig(
+        language=episode["language"], voice_a=episode["voice_a"], voice_b=episode["voice_b"],
+        script_mode=episode["script_mode"], pretranslate=episode["pretranslate"], metrics_sink=metrics_sink)
+
+async def run_episode(episode, output_dir, limits):
+    """Runs one episode through ingest, script and audio, holding each stage's concurrency slot"""
+    episode_dir = os.path.join(output_dir, episode["id"])
+    os.makedirs(episode_dir, exist_ok=True)
+    result = {"id": episode["id"], "language": episode["language"], "status": "running", "stages": {}}
+
+    async def stage(name, work):
+        async with limits[name]:
+            start = time.perf_counter()
+            try:
+                return await work()
+            finally:
+                result["stages"][name] = round(time.perf_counter() - start, 2)
+
+    metrics_sink = create_metrics_sink('memory')
+    config = episode_config(episode, metrics_sink)
+
+    try:
+        async def ingest():
+            content = await pipeline.ingest(episode["sources"])
+            result["source_errors"] = content.errors
+            return content
+
+        async def write_script():
+            script = await asyncio.to_thread(pipeline.write_script, content, config)
+            usage = script.usage
+            result["token_usage"] = {k: usage[k] for k in ("calls", "input_tokens", "output_tokens") if k in usage}
+            with open(os.path.join(episode_dir, 'podcast_script.txt'), 'w', encoding='utf-8') as f:
+                f.write(script.text)
+            return script
+
+        async def synthesize():
+            narrated = script
+            if config.pretranslate:
+                narrated = await asyncio.to_thread(pipeline.translate, script, config)
+                translated_file = pipeline.translated_script_path(os.path.join(episode_dir, 'podcast_script.txt'),
+                                                                  config.language)
+                with open(translated_file, 'w', encoding='utf-8') as f:
+                    f.write(narrated.text)
+            # Rendered in memory for this episode; the file in episode_dir is only a record of what was used
+            system_instructions = pipeline.audio_instructions(narrated, config)
+            with open(os.path.join(episode_dir, 'system_instructions_audio.txt'), 'w', encoding='utf-8') as f:
+                f.write(system_instructions)
+            final_output = os.path.join(episode_dir, 'final_podcast.wav')
+            with tempfile.TemporaryDirectory(dir=episode_dir) as work_dir:
+                audio = await pipeline.synthesize(narrated, work_dir, config, system_instructions)
+                pipeline.assemble(audio, final_output)
+            metrics_sink.close()
+            result["audio"] = summarize_metrics(metrics_sink.records)
+            return final_output
+
+        content = await stage("ingest", ingest)
+        script = await stage("script", write_script)
+        result["output"] = await stage("audio", synthesize)
+        result["status"] = "completed"
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    with open(os.path.join(episode_dir, 'episode.json'), 'w', encoding='utf-8') as f:
+        json.dump({**episode, **result}, f, indent=2)
+    print(f"[{episode['id']}] {result['status']}" + (f": {result['error']}" if result.get('error') else ""))
+    return result
+
+async def run_batch(episodes, output_dir, workers=4, ingest_concurrency=4, script_concurrency=2, audio_concurrency=2):
+    limits = {
+        "ingest": asyncio.Semaphore(ingest_concurrency),
+        "script": asyncio.Semaphore(script_concurrency),
+        "audio": asyncio.Semaphore(audio_concurrency),
+    }
+    worker_slots = asyncio.Semaphore(workers)
+
+    async def worker(episode):
+        async with worker_slots:
+            return await run_episode(episode, output_dir, limits)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(worker(episode) for episode in episodes))
+    summary = {
+        "episodes": len(results),
+        "completed": sum(1 for r in results if r["status"] == "completed"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "wall_seconds": round(time.perf_counter() - start, 2),
+        "results": results,
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'batch_summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+def main():
+    args = parse_arguments()
+    episodes = load_manifest(args.manifest)
+    print(f"Running {len(episodes)} episode(s) with {args.workers} worker(s)...")
+    summary = asyncio.run(run_batch(
+        episodes, args.output_dir, args.workers,
+        args.ingest_concurrency, args.script_concurrency, args.audio_concurrency))
+
+    print(f"\nBatch finished in {summary['wall_seconds']}s: "
+          f"{summary['completed']} completed, {summary['failed']} failed")
+    for result in summary["results"]:
+        stages = ", ".join(f"{name} {seconds}s" for name, seconds in result["stages"].items())
+        print(f"  {result['id']:20} {result['status']:10} {stages}")
+    print(f"Summary written to {os.path.join(args.output_dir, 'batch_summary.json')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmark_audio.py
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+import time
+import wave
+from mock_live_server import MockLiveServer
+
+WORDS = ("podcast audio model latency signal context speaker turn voice script "
+         "network session chunk episode research story idea question answer").split()
+SHORT_REPLIES = ["Right.", "Exactly!", "Hmm, interesting.", "Totally.", "Wait, really?"]
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark generate_audio against the mock Live API server.")
+    parser.add_argument('--lines', type=int, default=20, help='Number of script lines to synthesize')
+    parser.add_argument('--runs', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--chunk-size', type=int, default=4096)
+    parser.add_argument('--throughput', type=float, default=0.0)
+    parser.add_argument('--disconnect-every', type=int, default=0)
+    parser.add_argument('--disconnect-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+def build_script(line_count, seed):
+    rng = random.Random(seed)
+    lines = []
+    for i in range(line_count):
+        speaker = "A" if i % 2 == 0 else "B"
+        if rng.random() < 0.25:
+            text = rng.choice(SHORT_REPLIES)
+        else:
+            sentences = [
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 16))).capitalize() + "."
+                for _ in range(rng.randint(1, 4))
+            ]
+            text = " ".join(sentences)
+        lines.append(f"Speaker {speaker}: {text}")
+    return "\n".join(lines)
+
+def wav_duration(file_path):
+    with wave.open(file_path, 'rb') as wav_file:
+        return wav_file.getnframes() / wav_file.getframerate()
+
+async def run_once(args, run_index):
+    server = MockLiveServer(
+        port=0, latency=args.latency, chunk_size=args.chunk_size, throughput=args.throughput,
+        disconnect_every=args.disconnect_every, disconnect_rate=args.disconnect_rate,
+        seed=args.seed + run_index)
+
+    work_dir = tempfile.mkdtemp(prefix="audio_benchmark_")
+    original_dir = os.getcwd()
+    try:
+        async with server:
+            os.environ['LIVE_API_URI'] = server.uri
+            import generate_audio
+
+            with open(os.path.join(work_dir, 'podcast_script.txt'), 'w', encoding='utf-8') as f:
+                f.write(build_script(args.lines, args.seed + run_index))
+
+            os.chdir(work_dir)
+            start = time.perf_counter()
+            await generate_audio.main()
+            elapsed = time.perf_counter() - start
+
+        audio_seconds = wav_duration(os.path.join(work_dir, 'final_podcast.wav'))
+        return {"elapsed": elapsed, "audio_seconds": audio_seconds, **server.stats}
+    finally:
+        os.chdir(original_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+async def main():
+    args = parse_arguments()
+    results = []
+    for run_index in range(args.runs):
+        result = await run_once(args, run_index)
+        results.append(result)
+        print(f"Run {run_index + 1}: {result['elapsed']:.2f}s wall, {result['audio_seconds']:.1f}s audio, "
+              f"RTF {result['elapsed'] / result['audio_seconds']:.3f}, {result['turns']} turns, "
+              f"{result['sessions']} sessions, {result['disconnects']} disconnects")
+
+    elapsed = [result["elapsed"] for result in results]
+    print(f"\nLines: {args.lines}, latency: {args.latency}s, chunk size: {args.chunk_size} bytes")
+    print(f"Wall time: min {min(elapsed):.2f}s, mean {sum(elapsed) / len(elapsed):.2f}s, max {max(elapsed):.2f}s")
+
+if __name__ == "__main__":
+    asyncio.run(main())
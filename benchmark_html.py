@@ -0,0 +1,75 @@
+# benchmark_html.py
+
+import argparse
+import os
+import time
+import requests
+from html_extractor import extract_full_text, html_to_text
+
+# Rough average for English prose; only used to compare the two extraction paths
+CHARS_PER_TOKEN = 4
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Compare full-page and main-content HTML extraction.")
+    parser.add_argument('sources', nargs='*', help='URLs or local HTML files (a synthetic page is used if none are given)')
+    parser.add_argument('--repeat', type=int, default=20, help='Parses per source and extractor')
+    parser.add_argument('--count-tokens', action='store_true', help='Count tokens with the Gemini API instead of estimating')
+    return parser.parse_args()
+
+def synthetic_page(paragraphs=60):
+    nav = "".join(f'<li><a href="/section/{i}">Section {i}</a></li>' for i in range(40))
+    body = "".join(
+        f"<p>Paragraph {i} explains one part of the topic, with enough detail, examples and numbers "
+        f"to look like real article text that a podcast script would be written from.</p>"
+        for i in range(paragraphs)
+    )
+    return (
+        "<html><head><title>Article</title><script>var tracking = {};</script>"
+        "<style>body { font-family: sans-serif; }</style></head><body>"
+        f'<header><nav class="navbar"><ul>{nav}</ul></nav></header>'
+        '<div class="cookie-banner">We use cookies to improve your experience. Accept all?</div>'
+        f'<main><article><h1>Article title</h1>{body}</article></main>'
+        f'<aside class="sidebar"><ul>{nav}</ul></aside>'
+        '<footer>Copyright, imprint, privacy policy and terms of service.</footer>'
+        "</body></html>"
+    )
+
+def load_source(source):
+    if source.startswith(('http://', 'https://')):
+        response = requests.get(source, timeout=10)
+        response.raise_for_status()
+        return response.text
+    with open(source, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def count_tokens(text, use_api):
+    if use_api:
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
+        return genai.GenerativeModel('gemini-2.0-flash-exp').count_tokens(text).total_tokens
+    return len(text) // CHARS_PER_TOKEN
+
+def time_extractor(extract, html, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        text = extract(html)
+    return (time.perf_counter() - start) / repeat, text
+
+def main():
+    args = parse_arguments()
+    sources = args.sources or ['<synthetic>']
+    extractors = [("full (bs4)", extract_full_text), ("main (lxml)", html_to_text)]
+
+    for source in sources:
+        html = synthetic_page() if source == '<synthetic>' else load_source(source)
+        print(f"\n{source} ({len(html)} bytes of HTML)")
+        baseline_tokens = None
+        for name, extract in extractors:
+            seconds, text = time_extractor(extract, html, args.repeat)
+            tokens = count_tokens(text, args.count_tokens)
+            baseline_tokens = baseline_tokens or tokens
+            saved = 100 * (1 - tokens / baseline_tokens) if baseline_tokens else 0
+            print(f"  {name:12} {seconds * 1000:8.2f} ms/parse  {len(text):8} chars  {tokens:7} tokens  ({saved:.0f}% fewer)")
+
+if __name__ == "__main__":
+    main()
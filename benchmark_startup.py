@@ -0,0 +1,90 @@
+# benchmark_startup.py
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ENTRY_POINTS = ['generate_script', 'generate_audio', 'generate_podcast', 'batch_runner', 'podcast_ui']
+STARTUP_BUDGET_MS = float(os.getenv('STARTUP_BUDGET_MS', '250'))
+
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)')
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Measure import time of the CLI entry points with python -X importtime.")
+    parser.add_argument('modules', nargs='*', default=ENTRY_POINTS, help='Modules to import (default: all entry points)')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per module; the median is reported')
+    parser.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS,
+                        help='Fail if a module takes longer than this to import')
+    parser.add_argument('--top', type=int, default=5, help='Heaviest imports to list per module')
+    return parser.parse_args()
+
+def parse_import_times(stderr):
+    """Returns [(module, self_us, cumulative_us, depth)] from -X importtime output"""
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+def measure_import(module):
+    """Imports module in a fresh interpreter; returns (wall seconds, import entries) or raises on failure"""
+    command = [sys.executable, '-X', 'importtime', '-c', f'import {module}']
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        last_line = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "unknown error"
+        raise RuntimeError(last_line)
+    return wall, parse_import_times(result.stderr)
+
+def heaviest_imports(entries, module, count):
+    """Direct and indirect imports of module, by cumulative time, excluding the module itself"""
+    nested = [entry for entry in entries if entry[0] != module and entry[3] >= 1]
+    # Keep only the outermost entry of each package so one dependency is not listed several times
+    seen_roots = set()
+    heaviest = []
+    for name, _, cumulative, _ in sorted(nested, key=lambda entry: entry[2], reverse=True):
+        root = name.split('.')[0]
+        if root in seen_roots:
+            continue
+        seen_roots.add(root)
+        heaviest.append((name, cumulative))
+        if len(heaviest) == count:
+            break
+    return heaviest
+
+def main():
+    args = parse_arguments()
+    over_budget = []
+
+    for module in args.modules:
+        try:
+            runs = [measure_import(module) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{module:18} skipped: {e}")
+            continue
+
+        import_ms = statistics.median(
+            next((cumulative for name, _, cumulative, _ in entries if name == module), 0) for _, entries in runs
+        ) / 1000
+        wall_ms = statistics.median(wall for wall, _ in runs) * 1000
+        status = "ok" if import_ms <= args.budget_ms else "OVER BUDGET"
+        if import_ms > args.budget_ms:
+            over_budget.append(module)
+        print(f"{module:18} import {import_ms:8.1f} ms   process {wall_ms:8.1f} ms   {status}")
+        for name, cumulative in heaviest_imports(runs[-1][1], module, args.top):
+            print(f"    {name:40} {cumulative / 1000:8.1f} ms")
+
+    print(f"\nBudget: {args.budget_ms:.0f} ms per entry point")
+    if over_budget:
+        print(f"Over budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
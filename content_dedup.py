@@ -0,0 +1,116 @@
+# content_dedup.py
+
+import os
+import re
+import zlib
+from token_budget import estimate_tokens
+
+CONTENT_DEDUP = os.getenv('CONTENT_DEDUP', 'on').lower() != 'off'
+# Estimated Jaccard similarity of word shingles above which a paragraph counts as a copy
+DEDUP_THRESHOLD = float(os.getenv('DEDUP_THRESHOLD', '0.8'))
+# Paragraphs longer than this are compared line-block by line-block
+DEDUP_UNIT_CHARS = int(os.getenv('DEDUP_UNIT_CHARS', '600'))
+SHINGLE_WORDS = 5
+NUM_PERMUTATIONS = 64
+# 8 bands of 8 rows make pairs above ~0.77 similarity collide in at least one band
+LSH_BANDS = 8
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+
+# One-permutation hashing: the low bits of a shingle hash pick its bin, the rest is its value
+BIN_BITS = NUM_PERMUTATIONS.bit_length() - 1
+BIN_MASK = NUM_PERMUTATIONS - 1
+VALUE_RANGE = 1 << (32 - BIN_BITS)
+WORD = re.compile(r'\w+')
+PARAGRAPH_BOUNDARY = re.compile(r'\n\s*\n')
+
+def split_units(text, max_chars=DEDUP_UNIT_CHARS):
+    """Splits text into paragraphs, packing the lines of long paragraphs into blocks of about max_chars"""
+    units = []
+    for paragraph in PARAGRAPH_BOUNDARY.split(text):
+        paragraph = paragraph.strip()
+        if len(paragraph) <= max_chars:
+            if paragraph:
+                units.append(paragraph)
+            continue
+        block = ""
+        for line in paragraph.splitlines():
+            if block and len(block) + 1 + len(line) > max_chars:
+                units.append(block)
+                block = line
+            else:
+                block = f"{block}\n{line}" if block else line
+        if block:
+            units.append(block)
+    return units
+
+def shingles(text, size=SHINGLE_WORDS):
+    """Hashes every run of `size` consecutive lowercased words"""
+    words = WORD.findall(text.lower())
+    if len(words) < size:
+        return set()
+    return {zlib.crc32(' '.join(words[i:i + size]).encode('utf-8')) for i in range(len(words) - size + 1)}
+
+def minhash(shingle_set):
+    """MinHash signature in a single pass over the shingles (one-permutation hashing)"""
+    signature = [None] * NUM_PERMUTATIONS
+    for shingle in shingle_set:
+        bin_index, value = shingle & BIN_MASK, shingle >> BIN_BITS
+        if signature[bin_index] is None or value < signature[bin_index]:
+            signature[bin_index] = value
+    # Empty bins borrow from the next filled bin to the right, offset by the distance
+    filled = [i for i, value in enumerate(signature) if value is not None]
+    for i in range(NUM_PERMUTATIONS):
+        if signature[i] is None:
+            distance = next(((j - i) % NUM_PERMUTATIONS for j in filled if j > i), None)
+            if distance is None:
+                distance = filled[0] + NUM_PERMUTATIONS - i
+            signature[i] = signature[(i + distance) % NUM_PERMUTATIONS] + distance * VALUE_RANGE
+    return tuple(signature)
+
+def estimated_similarity(signature, other):
+    return sum(1 for x, y in zip(signature, other) if x == y) / NUM_PERMUTATIONS
+
+class NearDuplicateIndex:
+    """Remembers the MinHash signatures of kept paragraphs, bucketed by LSH band"""
+
+    def __init__(self, threshold=DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self.buckets = [{} for _ in range(LSH_BANDS)]
+
+    def add(self, text):
+        """Returns False if text nearly duplicates a paragraph already added, otherwise indexes it"""
+        shingle_set = shingles(text)
+        if not shingle_set:
+            # Too short to fingerprint reliably; headings and one-liners are always kept
+            return True
+        signature = minhash(shingle_set)
+        bands = [signature[i * LSH_ROWS:(i + 1) * LSH_ROWS] for i in range(LSH_BANDS)]
+        for buckets, band in zip(self.buckets, bands):
+            for candidate in buckets.get(band, ()):
+                if estimated_similarity(signature, candidate) >= self.threshold:
+                    return False
+        for buckets, band in zip(self.buckets, bands):
+            buckets.setdefault(band, []).append(signature)
+        return True
+
+def deduplicate_texts(texts, threshold=DEDUP_THRESHOLD):
+    """Drops near-duplicate paragraphs across all texts, keeping the first copy; returns (texts, report)"""
+    index = NearDuplicateIndex(threshold)
+    report = {"paragraphs": 0, "dropped": 0, "chars_saved": 0, "tokens_saved": 0}
+    deduplicated = []
+    for text in texts:
+        kept = []
+        for unit in split_units(text):
+            report["paragraphs"] += 1
+            if index.add(unit):
+                kept.append(unit)
+            else:
+                report["dropped"] += 1
+                report["chars_saved"] += len(unit)
+                report["tokens_saved"] += estimate_tokens(unit)
+        deduplicated.append("\n\n".join(kept))
+    return deduplicated, report
+
+def print_dedup_report(report):
+    print(f"Deduplication: dropped {report['dropped']} of {report['paragraphs']} paragraphs "
+          f"({report['chars_saved']} chars, ~{report['tokens_saved']} tokens saved)")
@@ -2,20 +2,42 @@
 
 import tempfile
 import asyncio
+import argparse
 import os
+from functools import lru_cache
 from audio_processor import AudioGenerator
 from dotenv import load_dotenv
 from pydub import AudioSegment
+from turn_validation import find_defective_turns, score_turn_file
+from turn_planner import plan_speaker_turns, split_batches, stitch_segments
+from audio_metrics import create_metrics_sink, print_metrics_summary
+from priming_context import PRIMING_CONTEXT, PRIMING_TOKEN_BUDGET, build_priming_context, line_positions
 
 load_dotenv()
 
 VOICE_A = os.getenv('VOICE_A', 'Puck')
 VOICE_B = os.getenv('VOICE_B', 'Kore')
+MAX_RESYNTH_ROUNDS = int(os.getenv('MAX_RESYNTH_ROUNDS', '2'))
+STREAMING_PRIMING_NOTE = ("The script is still being written, so instead of the full script you will "
+                          "receive the dialogue lines one at a time as soon as they are ready.")
 
-def parse_conversation(file_path):
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
+DEFAULT_LANGUAGE = 'English'
+# --languages accepts these codes as well as full language names
+LANGUAGE_NAMES = {
+    'en': 'English', 'es': 'Spanish', 'de': 'German', 'fr': 'French', 'it': 'Italian', 'pt': 'Portuguese',
+    'nl': 'Dutch', 'pl': 'Polish', 'ru': 'Russian', 'tr': 'Turkish', 'ar': 'Arabic', 'hi': 'Hindi',
+    'ja': 'Japanese', 'ko': 'Korean', 'zh': 'Chinese',
+}
+# Turns in flight at once across all sessions of a multi-language render
+MAX_INFLIGHT_TURNS = int(os.getenv('MAX_INFLIGHT_TURNS', '4'))
+# Resolved next to this module so rendering does not depend on the working directory
+AUDIO_TEMPLATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'system_instructions_audio_template.txt')
+# Used when the script was translated before synthesis, so the sessions only need to narrate it
+NARRATION_TEMPLATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                       'system_instructions_narration_template.txt')
+LANGUAGE_PLACEHOLDER = '[LANGUAGE]'
 
+def parse_script(content):
     lines = content.strip().split('\n')
     speaker_a_lines = []
     speaker_b_lines = []
@@ -29,6 +51,10 @@ def parse_conversation(file_path):
 
     return speaker_a_lines, speaker_b_lines
 
+def parse_conversation(file_path):
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return parse_script(file.read())
+
 def read_file_content(file_path):
     with open(file_path, 'r', encoding='utf-8') as file:
         return file.read()
@@ -37,33 +63,135 @@ async def setup_environment():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     return script_dir
 
-def read_and_parse_inputs():
-    system_instructions = read_file_content('system_instructions_audio.txt')
+def read_and_parse_inputs(language=DEFAULT_LANGUAGE):
+    system_instructions = render_audio_instructions(language)
     full_script = read_file_content('podcast_script.txt')
     speaker_a_lines, speaker_b_lines = parse_conversation('podcast_script.txt')
     return system_instructions, full_script, speaker_a_lines, speaker_b_lines
 
-def prepare_speaker_dialogues(system_instructions, full_script, speaker_lines, voice, temp_dir):
-    dialogues = [system_instructions + "\n\n" + full_script]
-    output_files = [os.path.join(temp_dir, f"speaker_{voice}_initial.wav")]
+def language_code(language):
+    """'Spanish' -> 'es'; names without a known code become 'swiss_german'"""
+    key = language.strip().lower()
+    if key in LANGUAGE_NAMES:
+        return key
+    codes = {name.lower(): code for code, name in LANGUAGE_NAMES.items()}
+    return codes.get(key, key.replace(' ', '_'))
+
+def parse_languages(value):
+    """'en,es,German' -> [('en', 'English'), ('es', 'Spanish'), ('de', 'German')]"""
+    languages = []
+    for item in value.split(','):
+        item = item.strip()
+        if item:
+            languages.append((language_code(item), LANGUAGE_NAMES.get(item.lower(), item)))
+    return languages
+
+@lru_cache(maxsize=None)
+def parse_audio_template(template_file, modified_time):
+    """Splits the template around its language placeholders; cached per file version"""
+    return tuple(read_file_content(template_file).split(LANGUAGE_PLACEHOLDER))
+
+def render_audio_instructions(language, template_file=AUDIO_TEMPLATE_FILE):
+    """Renders the narration instructions in memory, so concurrent jobs in different languages never share a file"""
+    return language.join(parse_audio_template(template_file, os.path.getmtime(template_file)))
+
+def prepare_speaker_dialogues(system_instructions, full_script, speaker_lines, voice, temp_dir,
+                              priming_mode=PRIMING_CONTEXT, priming_tokens=PRIMING_TOKEN_BUDGET, language=None,
+                              speaker=None):
+    """Returns the turn plan for one speaker; long lines become sentence sub-turns when enabled.
+
+    The session is primed with the instructions plus the script context; outside 'full' mode that
+    context is compacted to priming_tokens, so the first turn stays the same size however long the episode is.
+    """
+    # Where each of this speaker's lines sits in the script ('A' or 'B'); without it the window starts at the top
+    positions = line_positions(full_script, speaker) if speaker else []
 
-    for i, line in enumerate(speaker_lines):
-        dialogues.append(line)
-        output_files.append(os.path.join(temp_dir, f"speaker_{voice}_{i}.wav"))
+    def prime(line_index=0):
+        focus = positions[line_index] if line_index < len(positions) else 0
+        return system_instructions + "\n\n" + build_priming_context(full_script, priming_mode, priming_tokens, focus)
 
-    return dialogues, output_files
+    plan = plan_speaker_turns(prime(), speaker_lines, voice, temp_dir, language=language)
+    # Retries and resumed runs start mid-episode, so their sessions are primed around the first turn they redo
+    plan["prime"] = prime
+    return plan
 
-async def process_speaker(voice, dialogues, output_files):
+async def process_speaker(voice, dialogues, output_files, metrics_sink=None, turn_limiter=None):
     # Create a single generator for all dialogues
-    generator = AudioGenerator(voice)
+    generator = AudioGenerator(voice, metrics_sink, turn_limiter)
     
-    # Process the entire batch of dialogues at once
-    await generator.process_batch(dialogues, output_files)
+    # Process the entire batch of dialogues, resuming from the last finished turn on reconnect
+    await generator.run(dialogues, output_files)
 
     # Ensure the websocket connection is closed
     if generator.ws:
         await generator.ws.close()
 
+async def resynthesize_defective_turns(voice, dialogues, output_files, max_rounds=MAX_RESYNTH_ROUNDS, metrics_sink=None,
+                                       turn_limiter=None, prime=None, turn_lines=None):
+    """Validates each turn and re-synthesizes only the defective ones on a freshly primed session.
+
+    prime(line index) builds the priming turn for a session starting at that speaker line, and turn_lines
+    gives the speaker line of each turn after dialogues[0]; without them dialogues[0] is reused.
+    """
+    lines, line_files = dialogues[1:], output_files[1:]
+    defective = find_defective_turns(lines, line_files)
+
+    for attempt in range(max_rounds):
+        if not defective:
+            break
+        print(f"Re-synthesizing {len(defective)} defective turn(s) for {voice} (Round {attempt + 1}/{max_rounds})...")
+        for i, report in defective:
+            print(f"  Turn {i}: {', '.join(report['defects'])}")
+
+        priming = prime(turn_lines[defective[0][0]]) if prime and turn_lines else dialogues[0]
+        retry_dialogues = [priming] + [lines[i] for i, _ in defective]
+        retry_files = [output_files[0]] + [line_files[i] for i, _ in defective]
+        await process_speaker(voice, retry_dialogues, retry_files, metrics_sink, turn_limiter)
+
+        retried = [i for i, _ in defective]
+        defective = [
+            (i, report)
+            for i, report in zip(retried, (score_turn_file(line_files[i], lines[i]) for i in retried))
+            if report["defects"]
+        ]
+
+    if defective:
+        print(f"Warning: {len(defective)} turn(s) for {voice} still failed validation")
+    return defective
+
+async def synthesize_speaker(plan, metrics_sink=None, resume=False, turn_limiter=None):
+    """Synthesizes a speaker's turn plan into one validated audio file per line.
+
+    With resume, turns whose files survive from an interrupted run are kept, and only the
+    missing or defective ones are synthesized.
+    """
+    voice = plan["voice"]
+    finished = sum(1 for f in plan["output_files"][1:] if os.path.exists(f))
+    if resume and finished:
+        print(f"Resuming {voice}: {finished} of {len(plan['output_files']) - 1} turn(s) already synthesized")
+        # One extra round for the turns that were never synthesized at all
+        await resynthesize_defective_turns(voice, plan["dialogues"], plan["output_files"],
+                                           max_rounds=MAX_RESYNTH_ROUNDS + 1, metrics_sink=metrics_sink,
+                                           turn_limiter=turn_limiter, prime=plan.get("prime"),
+                                           turn_lines=plan.get("turn_lines"))
+    else:
+        await process_speaker(voice, plan["dialogues"], plan["output_files"], metrics_sink, turn_limiter)
+        await resynthesize_defective_turns(voice, plan["dialogues"], plan["output_files"], metrics_sink=metrics_sink,
+                                           turn_limiter=turn_limiter, prime=plan.get("prime"),
+                                           turn_lines=plan.get("turn_lines"))
+    stitch_segments(plan)
+
+    # Batched turns whose pauses do not match their line count fall back to one turn per line
+    unsplit = split_batches(plan)
+    if unsplit:
+        print(f"Could not split {len(unsplit)} batched line(s) for {voice}, synthesizing them individually...")
+        priming = plan["prime"](unsplit[0]) if "prime" in plan else plan["dialogues"][0]
+        dialogues = [priming] + [plan["lines"][i] for i in unsplit]
+        output_files = [plan["output_files"][0]] + [plan["line_files"][i] for i in unsplit]
+        await process_speaker(voice, dialogues, output_files, metrics_sink, turn_limiter)
+        await resynthesize_defective_turns(voice, dialogues, output_files, metrics_sink=metrics_sink,
+                                           turn_limiter=turn_limiter, prime=plan.get("prime"), turn_lines=unsplit)
+
 def interleave_output_files(speaker_a_files, speaker_b_files):
     """Interleaves the audio files from both speakers to maintain conversation order"""
     all_output_files = []
@@ -91,33 +219,124 @@ def combine_audio_files(file_list, output_file, silence_duration_ms=50):
 
     combined.export(output_file, format="wav")
 
-async def main():
+async def stream_script_to_audio(script_lines, system_instructions, final_output="final_podcast.wav",
+                                 script_file="podcast_script.txt", voice_a=VOICE_A, voice_b=VOICE_B, metrics_sink=None):
+    """Synthesizes script lines while they are still being generated.
+
+    script_lines is a (blocking) iterator of cleaned script lines. Each speaker line is queued to
+    its speaker's session as soon as it arrives, so script generation and audio synthesis overlap.
+    """
     script_dir = await setup_environment()
+    owns_sink = metrics_sink is None
+    metrics_sink = metrics_sink or create_metrics_sink()
+    loop = asyncio.get_running_loop()
+    voices = {"Speaker A:": voice_a, "Speaker B:": voice_b}
+    queues = {label: asyncio.Queue() for label in voices}
+    speaker_turns = {label: ([], []) for label in voices}
+    line_files = []
+    script = []
+
+    with tempfile.TemporaryDirectory(dir=script_dir) as temp_dir:
+        def produce_lines():
+            try:
+                with open(script_file, 'w', encoding='utf-8') as f:
+                    for line in script_lines:
+                        script.append(line)
+                        f.write(line + "\n")
+                        f.flush()
+                        label = line[:len("Speaker A:")]
+                        if label not in voices:
+                            continue
+                        text = line[len(label):].strip()
+                        output_file = os.path.join(temp_dir, f"line_{len(line_files):04d}.wav")
+                        line_files.append(output_file)
+                        speaker_turns[label][0].append(text)
+                        speaker_turns[label][1].append(output_file)
+                        loop.call_soon_threadsafe(queues[label].put_nowait, (text, output_file))
+            finally:
+                for queue in queues.values():
+                    loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        priming = system_instructions + "\n\n" + STREAMING_PRIMING_NOTE
+        priming_files = {label: os.path.join(temp_dir, f"speaker_{label[-2]}_initial.wav") for label in voices}
+        print("Streaming script lines into both speaker sessions...")
+        await asyncio.gather(
+            asyncio.to_thread(produce_lines),
+            *(
+                AudioGenerator(voices[label], metrics_sink).run_queue(priming, priming_files[label], queue)
+                for label, queue in queues.items()
+            )
+        )
+
+        # Validation re-primes with the full script, which is now complete
+        full_script = "\n".join(script)
+        for label, (lines, files) in speaker_turns.items():
+            await resynthesize_defective_turns(
+                voices[label],
+                [system_instructions + "\n\n" + full_script] + lines,
+                [priming_files[label]] + files,
+                metrics_sink=metrics_sink)
 
+        combine_audio_files(line_files, final_output, silence_duration_ms=50)
+        print(f"\nFinal podcast audio created: {final_output}")
+
+    if owns_sink:
+        metrics_sink.close()
+        print_metrics_summary(metrics_sink.records)
+    return final_output
+
+async def render_podcast_audio(full_script, system_instructions, final_output="final_podcast.wav",
+                               voice_a=VOICE_A, voice_b=VOICE_B, metrics_sink=None):
+    """Synthesizes a complete script into final_output without touching any shared files"""
+    script_dir = await setup_environment()
     with tempfile.TemporaryDirectory(dir=script_dir) as temp_dir:
-        system_instructions, full_script, speaker_a_lines, speaker_b_lines = read_and_parse_inputs()
-
-        # Prepare dialogues for both speakers
-        dialogues_a, output_files_a = prepare_speaker_dialogues(
-            system_instructions, full_script, speaker_a_lines, VOICE_A, temp_dir)
-        dialogues_b, output_files_b = prepare_speaker_dialogues(
-            system_instructions, full_script, speaker_b_lines, VOICE_B, temp_dir)
-
-        # Process Speaker A first
-        print("Processing Speaker A...")
-        await process_speaker(VOICE_A, dialogues_a, output_files_a)
-        
-        # Then process Speaker B
-        print("Processing Speaker B...")
-        await process_speaker(VOICE_B, dialogues_b, output_files_b)
-
-        # Interleave and combine audio as before
-        all_output_files = interleave_output_files(output_files_a[1:], output_files_b[1:])
-        final_output = "final_podcast.wav"
+        all_output_files = await synthesize_script(
+            full_script, system_instructions, temp_dir, voice_a, voice_b, metrics_sink)
         combine_audio_files(all_output_files, final_output, silence_duration_ms=50)
         print(f"\nFinal podcast audio created: {final_output}")
 
+    return final_output
+
+async def synthesize_script(full_script, system_instructions, temp_dir, voice_a=VOICE_A, voice_b=VOICE_B,
+                            metrics_sink=None, turn_limiter=None, language=None):
+    """Synthesizes every line into temp_dir and returns the line files in conversation order.
+
+    language is the language the script is written in (None for the source script), used to split long lines.
+    """
+    speaker_a_lines, speaker_b_lines = parse_script(full_script)
+
+    # Prepare dialogues for both speakers; a summary-based priming context may need a model call
+    plan_a = await asyncio.to_thread(
+        prepare_speaker_dialogues, system_instructions, full_script, speaker_a_lines, voice_a, temp_dir,
+        language=language, speaker='A')
+    plan_b = await asyncio.to_thread(
+        prepare_speaker_dialogues, system_instructions, full_script, speaker_b_lines, voice_b, temp_dir,
+        language=language, speaker='B')
+
+    # Process Speaker A first
+    print("Processing Speaker A...")
+    await synthesize_speaker(plan_a, metrics_sink, turn_limiter=turn_limiter)
+
+    # Then process Speaker B
+    print("Processing Speaker B...")
+    await synthesize_speaker(plan_b, metrics_sink, turn_limiter=turn_limiter)
+
+    # Interleave the per-line files as before
+    return interleave_output_files(plan_a["line_files"], plan_b["line_files"])
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Synthesize podcast_script.txt into final_podcast.wav.")
+    parser.add_argument('--language', default=DEFAULT_LANGUAGE, help='Language for audio narration')
+    return parser.parse_args()
+
+async def main(language=DEFAULT_LANGUAGE):
+    metrics_sink = create_metrics_sink()
+    system_instructions, full_script, _, _ = read_and_parse_inputs(language)
+    await render_podcast_audio(full_script, system_instructions, metrics_sink=metrics_sink)
+
     print("Temporary files cleaned up")
+    metrics_sink.close()
+    print_metrics_summary(metrics_sink.records)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(parse_arguments().language))
@@ -1,7 +1,5 @@
-import subprocess
-import os
+import asyncio
 import logging
-import sys
 import argparse
 
 # Custom formatter that only shows the message
@@ -21,50 +19,136 @@ logging.getLogger().handlers = []
 def parse_arguments():
     parser = argparse.ArgumentParser(description="Generate podcast with language option.")
     parser.add_argument('--language', default='English', help='Language for audio narration')
-    return parser.parse_args()
-
-def update_language_in_template(language):
-    template_file = 'system_instructions_audio_template.txt'
-    output_file = 'system_instructions_audio.txt'
-    
-    with open(template_file, 'r', encoding='utf-8') as file:
-        content = file.read()
-    
-    updated_content = content.replace('[LANGUAGE]', language)
-    
-    with open(output_file, 'w', encoding='utf-8') as file:
-        file.write(updated_content)
-
-def generate_podcast(language):
+    parser.add_argument('--languages',
+                        help='Comma-separated languages or codes (e.g. en,es,de); the script is written once and '
+                             'every language is rendered concurrently to final_podcast_<code>.wav')
+    parser.add_argument('--script-mode', choices=['single', 'mapreduce', 'auto', 'segmented'],
+                        help='How the script is generated; mapreduce condenses long content in parallel first, '
+                             'segmented writes outlined segments in parallel')
+    parser.add_argument('--script-format', choices=['text', 'json'],
+                        help='json requests schema-constrained turns and repairs only the malformed ones')
+    parser.add_argument('--pretranslate', action='store_true',
+                        help='Translate the script once as text before synthesis; the audio sessions then only narrate it')
+    parser.add_argument('--no-script-cache', action='store_true', help='Bypass the script cache')
+    parser.add_argument('--refresh-script-cache', action='store_true',
+                        help='Regenerate the script even if it is cached, then update the cache')
+    parser.add_argument('--stream', action='store_true',
+                        help='Start audio synthesis while the script is still being generated (skips the review pause)')
+    parser.add_argument('--fresh', action='store_true',
+                        help='Run every stage again instead of reusing stored results from earlier runs')
+    args = parser.parse_args()
+    # Each mode runs its own pipeline; reject options that pipeline would silently ignore
+    unsupported = {
+        '--languages': [('--stream', args.stream), ('--fresh', args.fresh)],
+        '--stream': [('--pretranslate', args.pretranslate), ('--fresh', args.fresh)],
+    }
+    mode = '--languages' if args.languages else '--stream' if args.stream else None
+    for option, given in unsupported.get(mode, []):
+        if given:
+            parser.error(f"{option} cannot be combined with {mode}")
+    return args
+
+def pipeline_config(language, script_mode=None, script_cache=None, script_format=None, pretranslate=False):
+    from pipeline import PipelineConfig
+    from audio_metrics import create_metrics_sink
+
+    config = PipelineConfig(language=language, metrics_sink=create_metrics_sink())
+    if script_mode:
+        config.script_mode = script_mode
+    if script_cache:
+        config.script_cache = script_cache
+    if script_format:
+        config.script_format = script_format
+    if pretranslate:
+        config.pretranslate = True
+    return config
+
+def review_script(script):
+    # Pause for user acknowledgment; edits saved to the file before pressing Enter are synthesized
+    from pipeline import translated_script_path
+
+    path = translated_script_path("podcast_script.txt", script.language) if script.language else "podcast_script.txt"
+    user_input = input(f"Script generated at {path}. Edit it if needed, then press Enter to proceed to audio "
+                       "generation or 'q' to quit: ")
+    if user_input.lower() == 'q':
+        logger.info("Process terminated by user.")
+        return False
+    logger.info("Converting script to audio...")
+    return True
+
+def finish(config, *episodes):
+    from audio_metrics import print_metrics_summary
+
+    config.metrics_sink.close()
+    episodes = [episode for episode in episodes if episode]
+    if episodes:
+        print_metrics_summary(config.metrics_sink.records)
+    for episode in episodes:
+        timings = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in episode.stage_seconds.items())
+        if episode.cached_stages:
+            timings += f"; reused {', '.join(episode.cached_stages)}"
+        logger.info(f"Podcast generation complete! Output: {episode.output_path} ({timings})")
+
+def generate_podcast(language, script_mode=None, script_cache=None, script_format=None, fresh=False,
+                     pretranslate=False):
+    # All stages run in this process and hand their results over in memory
+    import generate_script
+    from artifact_store import ARTIFACT_STORE
+    from pipeline import run_cached_pipeline, run_pipeline
+
     try:
-        # Update language in template file
-        update_language_in_template(language)
-        logger.info(f"Updated template for language: {language}")
+        config = pipeline_config(language, script_mode, script_cache, script_format, pretranslate)
+        specs = generate_script.prompt_for_sources()
+        logger.info("Generating podcast script...")
+        # With the artifact store, stages whose inputs are unchanged are skipped and an
+        # interrupted run resumes where it stopped
+        run = run_cached_pipeline if ARTIFACT_STORE and not fresh else run_pipeline
+        episode = asyncio.run(run(
+            specs, "final_podcast.wav", config, review=review_script, script_file="podcast_script.txt"))
+        finish(config, episode)
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+
+def generate_podcast_languages(languages, script_mode=None, script_cache=None, script_format=None,
+                               pretranslate=False):
+    # One ingest and one script, then every language variant is synthesized at the same time
+    import generate_audio
+    import generate_script
+    from pipeline import run_multilingual_pipeline
 
-        # Step 1: Generate script
+    try:
+        languages = generate_audio.parse_languages(languages)
+        config = pipeline_config(languages[0][1], script_mode, script_cache, script_format, pretranslate)
+        specs = generate_script.prompt_for_sources()
         logger.info("Generating podcast script...")
-        subprocess.run([sys.executable, "generate_script.py"], check=True)
-        
-        # Pause for user acknowledgment
-        user_input = input("Script generated at podcast_script.txt. Press Enter to proceed to audio generation or 'q' to quit: ")
-        if user_input.lower() == 'q':
-            logger.info("Process terminated by user.")
-            return
-
-        # Step 2: Generate audio with updated language file
-        logger.info("Converting script to audio...")
-        subprocess.run([sys.executable, "generate_audio.py"], check=True)
-        
-        if os.path.exists("final_podcast.wav"):
-            logger.info("Podcast generation complete! Output: final_podcast.wav")
-        else:
-            logger.error("Failed to generate final podcast audio")
-            
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Process failed: {str(e)}")
+        episodes = asyncio.run(run_multilingual_pipeline(
+            specs, languages, "final_podcast.wav", config, review=review_script, script_file="podcast_script.txt"))
+        finish(config, *(episodes or {}).values())
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+
+def generate_podcast_streaming(language, script_mode=None, script_cache=None, script_format=None):
+    # Script lines are handed to the audio sessions as soon as they are generated
+    import generate_script
+    from pipeline import run_streaming_pipeline
+
+    try:
+        config = pipeline_config(language, script_mode, script_cache, script_format)
+        specs = generate_script.prompt_for_sources()
+        logger.info("Generating script and audio together...")
+        episode = asyncio.run(run_streaming_pipeline(specs, "final_podcast.wav", config))
+        finish(config, episode)
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
 
 if __name__ == "__main__":
     args = parse_arguments()
-    generate_podcast(args.language)
+    script_cache = 'off' if args.no_script_cache else 'refresh' if args.refresh_script_cache else None
+    if args.languages:
+        generate_podcast_languages(args.languages, args.script_mode, script_cache, args.script_format,
+                                   args.pretranslate)
+    elif args.stream:
+        generate_podcast_streaming(args.language, args.script_mode, script_cache, args.script_format)
+    else:
+        generate_podcast(args.language, args.script_mode, script_cache, args.script_format, args.fresh,
+                         args.pretranslate)
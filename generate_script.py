@@ -1,5 +1,9 @@
 import os
 import re
+import time
+import hashlib
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,28 +12,113 @@ load_dotenv()
 os.environ['GRPC_VERBOSITY'] = 'NONE'         # Suppress gRPC logs
 os.environ['GLOG_minloglevel'] = '3'         # Suppress glog logs (3 = FATAL)
 
-# === Initialize absl logging to suppress warnings ===
-import absl.logging
-absl.logging.set_verbosity('error')
-absl.logging.use_absl_handler()
+# === Heavy SDKs (Gemini, absl, requests, aiohttp) are imported on first use to keep startup fast ===
+from html_extractor import HTML_EXTRACTOR, html_to_text
+from pdf_extractor import PDF_WORKERS, extract_pdf_text
+from disk_cache import DiskCache
+from script_mapreduce import MAP_CHUNK_CHARS, reduce_to_notes
+from token_budget import BUDGET_STRATEGY, SCRIPT_TOKEN_BUDGET, UsageTracker, fit_to_budget, print_token_report
+from script_cache import SCRIPT_CACHE, load_cached_script, script_cache_key, store_script
+from script_segments import SCRIPT_SEGMENTS, create_segmented_script
+from structured_script import (
+    SCRIPT_FORMAT, SCRIPT_FORMATS, STRUCTURED_GENERATION_CONFIG, STRUCTURED_NOTE, empty_repair_report, format_turn,
+    iter_json_turns, iter_valid_turns, normalize_turn, print_repair_report, repair_turns,
+)
+from content_dedup import CONTENT_DEDUP, deduplicate_texts, print_dedup_report
 
-# === Import other modules after setting environment variables ===
-import google.generativeai as genai
-import PyPDF2
-import requests
-from bs4 import BeautifulSoup
+SOURCE_TYPES = ('pdf', 'url', 'txt', 'md')
+SCRIPT_MODEL = 'gemini-2.0-flash-exp'
+# 'single' sends one prompt, 'mapreduce' condenses chunks first, 'auto' picks by content size,
+# 'segmented' outlines the episode and writes its segments concurrently
+SCRIPT_MODES = ('single', 'mapreduce', 'auto', 'segmented')
+SCRIPT_MODE = os.getenv('SCRIPT_MODE', 'single').lower()
+SPEAKER_LINE_PATTERN = r"^(Speaker A:|Speaker B:)"
+INGEST_MAX_CONNECTIONS = int(os.getenv('INGEST_MAX_CONNECTIONS', '10'))
+URL_TIMEOUT_SECONDS = 10
+
+# Bump a version whenever its extractor's output changes so stale entries are never served
+EXTRACTOR_VERSIONS = {'pdf': 'pypdf2-1', 'url': f'html-{HTML_EXTRACTOR}-2', 'txt': 'text-1', 'md': 'text-1'}
+CONTENT_CACHE_DIR = os.getenv('CONTENT_CACHE_DIR', os.path.join('.cache', 'content'))
+CONTENT_CACHE_MAX_MB = int(os.getenv('CONTENT_CACHE_MAX_MB', '512'))
+content_cache = (
+    DiskCache(CONTENT_CACHE_DIR, CONTENT_CACHE_MAX_MB * 1024 * 1024)
+    if os.getenv('CONTENT_CACHE', 'on').lower() != 'off' else None
+)
 
 # === Rest of your code ===
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cache_key(*parts):
+    return hashlib.sha256("\0".join(parts).encode('utf-8')).hexdigest()
+
+def cached_file_content(source_type, path, extract):
+    """Returns extract(path), reusing the cached text when the file's content hash is unchanged"""
+    if content_cache is None:
+        return extract(path)
+    key = cache_key(source_type, EXTRACTOR_VERSIONS[source_type], file_sha256(path))
+    entry = content_cache.get(key)
+    if entry is not None:
+        return entry["content"]
+    content = extract(path)
+    content_cache.put(key, {"type": source_type, "location": path, "content": content})
+    return content
+
+def lookup_url(url):
+    """Returns the cache key, the cached entry (or None) and the conditional request headers for a URL"""
+    if content_cache is None:
+        return None, None, {}
+    key = cache_key('url', EXTRACTOR_VERSIONS['url'], url)
+    # Counted once the response shows whether the cached text is still current
+    entry = content_cache.get(key, count=False)
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return key, entry, headers
+
+def cached_url_text(entry):
+    """The cached text of a URL the server answered with 304 Not Modified"""
+    content_cache.count("hits")
+    content_cache.count("revalidated")
+    return entry["content"]
+
+def store_url_text(key, entry, url, response_headers, html):
+    """Parses a fresh response unless its body is byte-identical to the cached one"""
+    if key is not None:
+        # The body was downloaded again, so this is a miss even when the parsed text can be reused
+        content_cache.count("misses")
+    body_sha256 = hashlib.sha256(html.encode('utf-8')).hexdigest()
+    if entry and entry.get("body_sha256") == body_sha256:
+        content = entry["content"]
+    else:
+        content = html_to_text(html)
+    if key is not None:
+        content_cache.put(key, {
+            "type": "url",
+            "location": url,
+            "content": content,
+            "body_sha256": body_sha256,
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+        })
+    return content
+
+def content_cache_report():
+    if content_cache is None:
+        return "Content cache disabled"
+    stats = content_cache.stats
+    return (f"Content cache: {stats['hits']} hits ({stats.get('revalidated', 0)} revalidated URLs), "
+            f"{stats['misses']} misses, {stats['evictions']} evictions")
+
 def read_pdf(pdf_path):
     try:
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in reader.pages:
-                extracted = page.extract_text()
-                if extracted:
-                    text += extracted
-        return text
+        return cached_file_content('pdf', pdf_path, extract_pdf_text)
     except FileNotFoundError:
         print(f"Error: PDF file not found at path: {pdf_path}")
         return ""
@@ -39,8 +128,7 @@ def read_pdf(pdf_path):
 
 def read_md(md_path):
     try:
-        with open(md_path, 'r', encoding='utf-8') as file:
-            return file.read()
+        return cached_file_content('md', md_path, read_text_file)
     except FileNotFoundError:
         print(f"Error: Markdown file not found at path: {md_path}")
         return ""
@@ -49,11 +137,14 @@ def read_md(md_path):
         return ""
 
 def read_url(url):
+    import requests
     try:
-        response = requests.get(url, timeout=10)
+        key, entry, headers = lookup_url(url)
+        response = requests.get(url, timeout=URL_TIMEOUT_SECONDS, headers=headers)
+        if response.status_code == 304 and entry:
+            return cached_url_text(entry)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        return soup.get_text()
+        return store_url_text(key, entry, url, response.headers, response.text)
     except requests.exceptions.RequestException as e:
         print(f"Error accessing URL: {str(e)}")
         return ""
@@ -63,8 +154,7 @@ def read_url(url):
 
 def read_txt(txt_path):
     try:
-        with open(txt_path, 'r', encoding='utf-8') as file:
-            return file.read()
+        return cached_file_content('txt', txt_path, read_text_file)
     except FileNotFoundError:
         print(f"Error: Text file not found at path: {txt_path}")
         return ""
@@ -72,9 +162,96 @@ def read_txt(txt_path):
         print(f"Error reading text file: {str(e)}")
         return ""
 
-def get_content_from_sources():
-    sources = []
-    content = ""
+def read_text_file(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+def parse_source_spec(spec):
+    """Accepts {'type': ..., 'location': ...} or a 'type:location' string such as 'url:https://...'"""
+    if isinstance(spec, dict):
+        source_type, location = spec["type"], spec["location"]
+    else:
+        source_type, _, location = spec.partition(':')
+    source_type = source_type.lower().strip()
+    if source_type not in SOURCE_TYPES:
+        raise ValueError(f"Invalid source type: {source_type}")
+    return {"type": source_type, "location": location.strip()}
+
+async def fetch_url_text(session, url):
+    import aiohttp
+    key, entry, headers = lookup_url(url)
+    timeout = aiohttp.ClientTimeout(total=URL_TIMEOUT_SECONDS)
+    async with session.get(url, timeout=timeout, headers=headers) as response:
+        if response.status == 304 and entry:
+            return cached_url_text(entry)
+        response.raise_for_status()
+        html = await response.text()
+        response_headers = {name: response.headers.get(name) for name in ("ETag", "Last-Modified")}
+    return await asyncio.to_thread(store_url_text, key, entry, url, response_headers, html)
+
+async def ingest_source(source, session, pdf_pool):
+    start = time.perf_counter()
+    content, error, page_timings = "", None, []
+    try:
+        if source["type"] == "url":
+            content = await fetch_url_text(session, source["location"])
+        elif source["type"] == "pdf":
+            # Pages of every PDF are spread over the shared process pool
+            extract = lambda path: extract_pdf_text(path, pdf_pool, page_timings)
+            content = await asyncio.to_thread(cached_file_content, "pdf", source["location"], extract)
+        else:
+            content = await asyncio.to_thread(cached_file_content, source["type"], source["location"], read_text_file)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    result = {**source, "content": content, "seconds": time.perf_counter() - start, "error": error}
+    if source["type"] == "pdf":
+        result["page_timings"] = page_timings
+    return result
+
+async def ingest_sources_async(specs, max_connections=INGEST_MAX_CONNECTIONS, pdf_workers=PDF_WORKERS):
+    import aiohttp
+    sources = [parse_source_spec(spec) for spec in specs]
+    has_pdf = any(source["type"] == "pdf" for source in sources)
+    pdf_pool = ProcessPoolExecutor(max_workers=max(1, pdf_workers)) if has_pdf else None
+    try:
+        connector = aiohttp.TCPConnector(limit=max_connections)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            return await asyncio.gather(*(ingest_source(source, session, pdf_pool) for source in sources))
+    finally:
+        if pdf_pool:
+            pdf_pool.shutdown()
+
+def ingest_sources(specs, max_connections=INGEST_MAX_CONNECTIONS, pdf_workers=PDF_WORKERS):
+    """Fetches and parses all sources concurrently.
+
+    Returns one result per spec, in input order, with the extracted content, the time
+    taken and the error (if any) for each source.
+    """
+    return asyncio.run(ingest_sources_async(specs, max_connections, pdf_workers))
+
+def combine_ingested_content(results, dedup=CONTENT_DEDUP):
+    texts = []
+    for result in results:
+        if result["error"]:
+            print(f"Error reading {result['type']} source {result['location']}: {result['error']}")
+        elif result["content"]:
+            texts.append(result["content"])
+
+    # Syndicated copies and shared boilerplate would otherwise be paid for once per source
+    if dedup and texts:
+        texts, report = deduplicate_texts(texts)
+        print_dedup_report(report)
+    return "".join(text + "\n" for text in texts)
+
+def prompt_for_sources():
+    """Asks for sources on the command line and returns their specs"""
+    specs = []
+    prompts = {
+        "pdf": "Enter PDF file path: ",
+        "url": "Enter URL: ",
+        "md": "Enter Markdown file path: ",
+        "txt": "Enter text file path: ",
+    }
     
     while True:
         source_type = input("Enter source type (pdf/url/txt/md) or 'done' to finish: ").lower().strip()
@@ -82,30 +259,20 @@ def get_content_from_sources():
         if source_type == 'done':
             break
             
-        if source_type == "pdf":
-            pdf_path = input("Enter PDF file path: ").strip()
-            pdf_content = read_pdf(pdf_path)
-            if pdf_content:
-                content += pdf_content + "\n"
-        elif source_type == "url":
-            url = input("Enter URL: ").strip()
-            url_content = read_url(url)
-            if url_content:
-                content += url_content + "\n"
-        elif source_type == "md":
-            md_path = input("Enter Markdown file path: ").strip()
-            md_content = read_md(md_path)
-            if md_content:
-                content += md_content + "\n"
-        elif source_type == "txt":
-            txt_path = input("Enter text file path: ").strip()
-            txt_content = read_txt(txt_path)
-            if txt_content:
-                content += txt_content + "\n"
+        if source_type in prompts:
+            location = input(prompts[source_type]).strip()
+            specs.append({"type": source_type, "location": location})
         else:
             print("Invalid source type. Please try again.")
-            
-    return content
+    return specs
+
+def get_content_from_sources():
+    # Fetch and parse all sources at once instead of one after another
+    results = ingest_sources(prompt_for_sources())
+    for result in results:
+        print(f"Ingested {result['type']} source {result['location']} in {result['seconds']:.2f}s")
+    print(content_cache_report())
+    return combine_ingested_content(results)
 
 def load_prompt_template():
     try:
@@ -114,25 +281,104 @@ def load_prompt_template():
     except FileNotFoundError:
         raise FileNotFoundError("Prompt template file not found in system_instructions_script.txt")
 
-def create_podcast_script(content):
-    try:
-        # Initialize Gemini
-        genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
-        model = genai.GenerativeModel('gemini-2.0-flash-exp')
+def load_genai():
+    """Imports the Gemini SDK, which dominates this module's import time, on first use"""
+    # === Initialize absl logging to suppress warnings ===
+    import absl.logging
+    absl.logging.set_verbosity('error')
+    absl.logging.use_absl_handler()
+
+    # === Import the SDK after setting environment variables ===
+    import google.generativeai as genai
+    return genai
+
+def create_script_model():
+    # Initialize Gemini, tracking token usage over every call made for this script
+    genai = load_genai()
+    genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
+    return UsageTracker(genai.GenerativeModel(SCRIPT_MODEL))
 
-        # Load prompt template and format with content
+def uses_structured_output(mode, script_format):
+    # Segments are stitched as text lines, so segmented mode always uses the text format
+    return script_format == 'json' and mode != 'segmented'
+
+def generation_settings(mode, token_budget, script_format=SCRIPT_FORMAT):
+    """Everything besides model, template and content that changes the generated script"""
+    if mode not in SCRIPT_MODES:
+        raise ValueError(f"Unknown script mode: {mode} (expected one of {', '.join(SCRIPT_MODES)})")
+    if script_format not in SCRIPT_FORMATS:
+        raise ValueError(f"Unknown script format: {script_format} (expected one of {', '.join(SCRIPT_FORMATS)})")
+    settings = {
+        "mode": mode,
+        "token_budget": token_budget,
+        "budget_strategy": BUDGET_STRATEGY if token_budget else None,
+        "map_chunk_chars": MAP_CHUNK_CHARS if mode != 'single' else None,
+        "segments": SCRIPT_SEGMENTS if mode == 'segmented' else None,
+    }
+    # Only added for JSON so that text-format scripts keep their existing cache keys
+    if uses_structured_output(mode, script_format):
+        settings["format"] = "json"
+    return settings
+
+def prepare_script_content(model, content, mode=SCRIPT_MODE, token_budget=SCRIPT_TOKEN_BUDGET, prompt_template=None):
+    """Fits the content to the token budget and condenses it in map-reduce mode; returns (content, budget_report)"""
+    prompt_template = prompt_template or load_prompt_template()
+    budget_report = None
+    if token_budget:
+        content, budget_report = fit_to_budget(model, prompt_template, content, token_budget)
+
+    if mode == 'mapreduce' or (mode in ('auto', 'segmented') and len(content) > MAP_CHUNK_CHARS):
+        content = reduce_to_notes(model, content)
+    return content, budget_report
+
+def build_script_prompt(model, content, mode=SCRIPT_MODE, token_budget=SCRIPT_TOKEN_BUDGET, prompt_template=None):
+    """Returns (prompt, budget_report) for writing the whole script in one call"""
+    prompt_template = prompt_template or load_prompt_template()
+    content, budget_report = prepare_script_content(model, content, mode, token_budget, prompt_template)
+    return f"{prompt_template}\n\nContent: {content}", budget_report
+
+def create_podcast_script(content, mode=SCRIPT_MODE, token_budget=SCRIPT_TOKEN_BUDGET, report=None,
+                          cache_mode=SCRIPT_CACHE, script_format=SCRIPT_FORMAT):
+    try:
+        # Identical model, template, content and settings always give back the cached script
         prompt_template = load_prompt_template()
-        prompt = f"{prompt_template}\n\nContent: {content}"
-        
-        response = model.generate_content(prompt)
-        return response.text
+        settings = generation_settings(mode, token_budget, script_format)
+        key = script_cache_key(SCRIPT_MODEL, prompt_template, content, settings)
+        cached = load_cached_script(key, cache_mode)
+        if cached is not None:
+            return cached["raw"]
+
+        model = create_script_model()
+        metadata = {"model": SCRIPT_MODEL, "mode": mode}
+        if mode == 'segmented':
+            content, budget_report = prepare_script_content(model, content, mode, token_budget, prompt_template)
+            script = create_segmented_script(model, prompt_template, content)
+        elif uses_structured_output(mode, script_format):
+            prompt, budget_report = build_script_prompt(
+                model, content, mode, token_budget, prompt_template + STRUCTURED_NOTE)
+            response = model.generate_content(prompt, generation_config=STRUCTURED_GENERATION_CONFIG)
+            turns = [normalize_turn(turn) for turn in iter_json_turns([response.text])]
+            turns, repair_report = repair_turns(model, turns)
+            print_repair_report(repair_report)
+            script = "\n".join(format_turn(turn) for turn in turns)
+            metadata.update(json=response.text, repair=repair_report)
+        else:
+            prompt, budget_report = build_script_prompt(model, content, mode, token_budget, prompt_template)
+            response = model.generate_content(prompt)
+            script = response.text
+
+        print_token_report(model.usage, budget_report)
+        store_script(key, script, clean_podcast_script(script), {**metadata, "usage": model.usage}, cache_mode)
+        if report is not None:
+            report.update(model.usage, budget=budget_report)
+        return script
     except Exception as e:
         print(f"Error generating content: {str(e)}")
         return None
     
 def clean_podcast_script(script):
     # Define a regex pattern to identify the start of the podcast text
-    podcast_start_pattern = r"^(Speaker A:|Speaker B:)"
+    podcast_start_pattern = SPEAKER_LINE_PATTERN
     
     # Split the script into lines
     lines = script.splitlines()
@@ -146,6 +392,85 @@ def clean_podcast_script(script):
     # If no match is found, return the original script
     return script
 
+def iter_clean_script_lines(chunks):
+    """Incremental clean_podcast_script: yields each complete line from the first speaker line on"""
+    buffer = ""
+    skipped = []
+    started = False
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if not started and re.match(SPEAKER_LINE_PATTERN, line):
+                started = True
+            if started:
+                yield line
+            else:
+                skipped.append(line)
+
+    if buffer:
+        if not started and re.match(SPEAKER_LINE_PATTERN, buffer):
+            started = True
+        if started:
+            yield buffer
+        else:
+            skipped.append(buffer)
+
+    # Like clean_podcast_script, fall back to the raw text when no speaker line was found
+    if not started:
+        yield from skipped
+
+def stream_podcast_script(content, mode=SCRIPT_MODE, token_budget=SCRIPT_TOKEN_BUDGET, cache_mode=SCRIPT_CACHE,
+                          script_format=SCRIPT_FORMAT):
+    """Generates the script with a streaming call and yields cleaned lines as soon as they are complete"""
+    prompt_template = load_prompt_template()
+    key = script_cache_key(SCRIPT_MODEL, prompt_template, content, generation_settings(mode, token_budget, script_format))
+    cached = load_cached_script(key, cache_mode)
+    if cached is not None:
+        yield from cached["cleaned"].splitlines()
+        return
+
+    if mode == 'segmented':
+        # Segments finish together and their joins are rewritten, so lines are only final at the end
+        script = create_podcast_script(content, mode, token_budget, cache_mode=cache_mode)
+        yield from clean_podcast_script(script).splitlines() if script else []
+        return
+
+    model = create_script_model()
+    structured = uses_structured_output(mode, script_format)
+    if structured:
+        prompt, budget_report = build_script_prompt(
+            model, content, mode, token_budget, prompt_template + STRUCTURED_NOTE)
+        response = model.generate_content(prompt, stream=True, generation_config=STRUCTURED_GENERATION_CONFIG)
+    else:
+        prompt, budget_report = build_script_prompt(model, content, mode, token_budget, prompt_template)
+        response = model.generate_content(prompt, stream=True)
+    raw_chunks = []
+
+    def chunk_texts():
+        for chunk in response:
+            raw_chunks.append(chunk.text)
+            yield chunk.text
+
+    metadata = {"model": SCRIPT_MODEL, "mode": mode}
+    if structured:
+        # Each turn goes to audio as soon as its JSON object closes; malformed runs are repaired in place
+        repair_report = empty_repair_report()
+        lines = []
+        for turn in iter_valid_turns(model, iter_json_turns(chunk_texts()), repair_report):
+            lines.append(format_turn(turn))
+            yield lines[-1]
+        script = "\n".join(lines)
+        print_repair_report(repair_report)
+        metadata.update(json="".join(raw_chunks), repair=repair_report)
+    else:
+        yield from iter_clean_script_lines(chunk_texts())
+        script = "".join(raw_chunks)
+
+    model.record(prompt, response, "".join(raw_chunks))
+    print_token_report(model.usage, budget_report)
+    store_script(key, script, clean_podcast_script(script), {**metadata, "usage": model.usage}, cache_mode)
+
 def main():
     # Get content from multiple sources
     content = get_content_from_sources()
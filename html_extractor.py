@@ -0,0 +1,110 @@
+# html_extractor.py
+
+import os
+import re
+
+# 'main' keeps only the main content, 'full' is the original BeautifulSoup get_text() behavior
+HTML_EXTRACTOR = os.getenv('HTML_EXTRACTOR', 'main').lower()
+MIN_MAIN_CONTENT_CHARS = 200
+MIN_MAIN_CONTENT_SHARE = 0.25
+
+BOILERPLATE_TAGS = ('script', 'style', 'noscript', 'template', 'svg', 'iframe', 'nav', 'footer',
+                    'aside', 'form', 'button', 'select', 'dialog')
+# Only page-level headers are boilerplate; the header of an article holds its title and byline
+PAGE_HEADERS = '//header[not(ancestor::article or ancestor::main)]'
+BOILERPLATE_PREFIXES = ('cookie', 'consent', 'gdpr', 'banner', 'navbar', 'nav', 'menu', 'footer', 'sidebar',
+                        'subscribe', 'newsletter', 'share', 'social', 'advert', 'ad-', 'promo', 'popup',
+                        'modal', 'breadcrumb', 'related', 'comment', 'skip-link')
+BLOCK_TAGS = ('p', 'div', 'section', 'article', 'main', 'li', 'ul', 'ol', 'table', 'tr', 'blockquote',
+              'pre', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'br', 'dd', 'dt', 'figcaption')
+XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>', re.IGNORECASE)
+
+def load_lxml():
+    """Imports lxml.html on first use, or returns None if it is not installed"""
+    try:
+        import lxml.html
+        return lxml.html
+    except ImportError:
+        return None
+
+def extract_full_text(html):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    return soup.get_text()
+
+def is_boilerplate(element):
+    if element.tag in ('html', 'body', 'main', 'article'):
+        return False
+    tokens = f"{element.get('class', '')} {element.get('id', '')} {element.get('role', '')}".lower().split()
+    if not any(token.startswith(BOILERPLATE_PREFIXES) for token in tokens):
+        return False
+    # Never drop a wrapper that holds the article itself
+    return not element.xpath('.//article|.//main')
+
+def remove_boilerplate(root):
+    for element in root.xpath('//' + '|//'.join(BOILERPLATE_TAGS) + '|' + PAGE_HEADERS):
+        element.drop_tree()
+    for element in list(root.iter()):
+        if isinstance(element.tag, str) and element.getparent() is not None and is_boilerplate(element):
+            element.drop_tree()
+
+def text_length(element):
+    return len(' '.join(element.text_content().split()))
+
+def select_main_content(root):
+    """Scores paragraph containers readability-style and returns the best one"""
+    scores = {}
+    for paragraph in root.iter('p', 'pre', 'blockquote', 'li', 'td'):
+        length = text_length(paragraph)
+        if length < 25:
+            continue
+        score = 1 + length / 100 + paragraph.text_content().count(',')
+        parent = paragraph.getparent()
+        if parent is None:
+            continue
+        scores[parent] = scores.get(parent, 0) + score
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            scores[grandparent] = scores.get(grandparent, 0) + score / 2
+
+    best, best_score = None, 0
+    for candidate, score in scores.items():
+        total = text_length(candidate) or 1
+        link_chars = sum(text_length(link) for link in candidate.iter('a'))
+        score *= 1 - min(link_chars / total, 1)
+        if candidate.tag in ('article', 'main'):
+            score *= 1.25
+        if score > best_score:
+            best, best_score = candidate, score
+    return best
+
+def element_text(element):
+    for block in element.iter(*BLOCK_TAGS):
+        block.tail = "\n" + (block.tail or "")
+    lines = (' '.join(line.split()) for line in element.text_content().splitlines())
+    return "\n".join(line for line in lines if line)
+
+def extract_main_text(html):
+    """Returns the main content of a page as plain text, without navigation or other boilerplate"""
+    root = load_lxml().document_fromstring(XML_DECLARATION.sub('', html))
+    remove_boilerplate(root)
+    body = root.find('body')
+    if body is None:
+        body = root
+
+    main = select_main_content(body)
+    if main is None or text_length(main) < MIN_MAIN_CONTENT_SHARE * text_length(body):
+        main = body
+    return element_text(main)
+
+def html_to_text(html, mode=HTML_EXTRACTOR):
+    """Extracts text with lxml main-content selection, falling back to the full BeautifulSoup text"""
+    if mode == 'full' or load_lxml() is None:
+        return extract_full_text(html)
+    try:
+        text = extract_main_text(html)
+    except Exception:
+        return extract_full_text(html)
+    if len(text) < MIN_MAIN_CONTENT_CHARS:
+        return extract_full_text(html)
+    return text
@@ -0,0 +1,208 @@
+# job_queue.py
+
+import json
+import os
+import sqlite3
+import time
+
+JOB_QUEUE_DB = os.getenv('JOB_QUEUE_DB', 'jobs.sqlite3')
+# A running job whose worker has not renewed its lease for this long is handed to another worker
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '300'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+
+JOB_STATES = ('queued', 'running', 'completed', 'failed')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    episode TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id INTEGER NOT NULL,
+    at REAL NOT NULL,
+    state TEXT NOT NULL,
+    worker TEXT,
+    detail TEXT
+);
+CREATE TABLE IF NOT EXISTS job_artifacts (
+    job_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    sha256 TEXT,
+    PRIMARY KEY (job_id, name)
+);
+"""
+
+class JobQueue:
+    """Durable episode queue in one SQLite file, shared safely by several worker processes.
+
+    Workers claim jobs under a lease that they keep renewing. A job whose lease runs out (its
+    worker crashed or was killed) is claimed again by the next worker that asks. Every state
+    change is recorded in job_events. Updates from a worker that no longer holds the lease are ignored.
+    """
+
+    def __init__(self, path=JOB_QUEUE_DB, lease_seconds=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self.connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def connect(self):
+        # One connection per call, so the queue can be used from worker threads as well
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def transaction(self):
+        return Transaction(self.connect())
+
+    def log(self, conn, job_id, state, worker=None, detail=None):
+        conn.execute("INSERT INTO job_events (job_id, at, state, worker, detail) VALUES (?, ?, ?, ?, ?)",
+                     (job_id, time.time(), state, worker, detail))
+
+    def enqueue(self, episode):
+        now = time.time()
+        with self.transaction() as conn:
+            job_id = conn.execute(
+                "INSERT INTO jobs (episode, state, created_at, updated_at) VALUES (?, 'queued', ?, ?)",
+                (json.dumps(episode), now, now)).lastrowid
+            self.log(conn, job_id, 'queued', detail=episode.get("id"))
+        return job_id
+
+    def claim(self, worker):
+        """Leases the oldest queued job, or a running one whose lease expired; returns it or None"""
+        now = time.time()
+        with self.transaction() as conn:
+            while True:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE state = 'queued' OR (state = 'running' AND lease_expires < ?) "
+                    "ORDER BY id LIMIT 1", (now,)).fetchone()
+                if row is None:
+                    return None
+                if row["state"] == 'queued' or row["attempts"] < self.max_attempts:
+                    return self.lease(conn, row, worker, now)
+                error = "lease expired on the last attempt"
+                conn.execute("UPDATE jobs SET state = 'failed', worker = NULL, lease_expires = NULL, error = ?, "
+                             "updated_at = ? WHERE id = ?", (error, now, row["id"]))
+                self.log(conn, row["id"], 'failed', row["worker"], error)
+
+    def lease(self, conn, row, worker, now):
+        detail = f"reclaimed from {row['worker']} after its lease expired" if row["state"] == 'running' else None
+        conn.execute("UPDATE jobs SET state = 'running', attempts = attempts + 1, worker = ?, lease_expires = ?, "
+                     "updated_at = ? WHERE id = ?", (worker, now + self.lease_seconds, now, row["id"]))
+        self.log(conn, row["id"], 'running', worker, detail)
+        return {"id": row["id"], "episode": json.loads(row["episode"]), "attempt": row["attempts"] + 1}
+
+    def heartbeat(self, job_id, worker):
+        """Renews the lease; False means this worker lost the job and should stop working on it"""
+        now = time.time()
+        with self.transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND worker = ? AND state = 'running'",
+                (now + self.lease_seconds, now, job_id, worker)).rowcount
+        return updated == 1
+
+    def complete(self, job_id, worker, result, artifacts=None):
+        """Marks the job completed and records its artifacts as {name: (path, sha256)}"""
+        now = time.time()
+        with self.transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET state = 'completed', worker = NULL, lease_expires = NULL, result = ?, error = NULL, "
+                "updated_at = ? WHERE id = ? AND worker = ? AND state = 'running'",
+                (json.dumps(result), now, job_id, worker)).rowcount
+            if not updated:
+                return False
+            for name, (path, digest) in (artifacts or {}).items():
+                conn.execute("INSERT OR REPLACE INTO job_artifacts (job_id, name, path, sha256) VALUES (?, ?, ?, ?)",
+                             (job_id, name, path, digest))
+            self.log(conn, job_id, 'completed', worker)
+        return True
+
+    def fail(self, job_id, worker, error):
+        """Queues the job again if it has attempts left, otherwise marks it failed"""
+        now = time.time()
+        with self.transaction() as conn:
+            row = conn.execute("SELECT attempts FROM jobs WHERE id = ? AND worker = ? AND state = 'running'",
+                               (job_id, worker)).fetchone()
+            if row is None:
+                return False
+            state = 'queued' if row["attempts"] < self.max_attempts else 'failed'
+            conn.execute("UPDATE jobs SET state = ?, worker = NULL, lease_expires = NULL, error = ?, updated_at = ? "
+                         "WHERE id = ?", (state, error, now, job_id))
+            self.log(conn, job_id, state, worker, error)
+        return True
+
+    def release(self, job_id, worker, reason):
+        """Gives a job back without counting the attempt, e.g. when the worker shuts down"""
+        now = time.time()
+        with self.transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET state = 'queued', attempts = MAX(attempts - 1, 0), worker = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE id = ? AND worker = ? AND state = 'running'",
+                (now, job_id, worker)).rowcount
+            if updated:
+                self.log(conn, job_id, 'queued', worker, reason)
+        return updated == 1
+
+    def retry(self, job_id):
+        """Queues a failed job again with a fresh set of attempts"""
+        now = time.time()
+        with self.transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET state = 'queued', attempts = 0, error = NULL, updated_at = ? "
+                "WHERE id = ? AND state = 'failed'", (now, job_id)).rowcount
+            if updated:
+                self.log(conn, job_id, 'queued', detail="retried")
+        return updated == 1
+
+    def jobs(self, state=None):
+        with self.transaction() as conn:
+            query = "SELECT * FROM jobs" + (" WHERE state = ?" if state else "") + " ORDER BY id"
+            return [dict(row) for row in conn.execute(query, (state,) if state else ())]
+
+    def counts(self):
+        with self.transaction() as conn:
+            rows = conn.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state").fetchall()
+        return {state: 0 for state in JOB_STATES} | {row["state"]: row["n"] for row in rows}
+
+    def events(self, job_id):
+        with self.transaction() as conn:
+            return [dict(row) for row in conn.execute(
+                "SELECT * FROM job_events WHERE job_id = ? ORDER BY at, rowid", (job_id,))]
+
+    def artifacts(self, job_id):
+        with self.transaction() as conn:
+            return [dict(row) for row in conn.execute(
+                "SELECT name, path, sha256 FROM job_artifacts WHERE job_id = ? ORDER BY name", (job_id,))]
+
+class Transaction:
+    """BEGIN IMMEDIATE ... COMMIT on one connection, so concurrent claims never hand out the same job"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.conn.close()
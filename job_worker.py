@@ -0,0 +1,169 @@
+# job_worker.py
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import time
+from batch_runner import episode_config, load_manifest
+from job_queue import JOB_QUEUE_DB, JobQueue
+
+JOB_OUTPUT_DIR = os.getenv('JOB_OUTPUT_DIR', 'job_output')
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '5'))
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Queue podcast episodes and run them with long-lived workers.")
+    parser.add_argument('--db', default=JOB_QUEUE_DB, help='SQLite queue file shared by all workers')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue = commands.add_parser('enqueue', help='Add the episodes of a manifest (same format as batch_runner.py)')
+    enqueue.add_argument('manifest')
+
+    work = commands.add_parser('work', help='Run queued jobs until stopped')
+    work.add_argument('--parallel', type=int, default=2, help='Jobs this worker runs at the same time')
+    work.add_argument('--output-dir', default=JOB_OUTPUT_DIR, help='One job-<id> directory per job is created here')
+    work.add_argument('--poll-seconds', type=float, default=JOB_POLL_SECONDS)
+    work.add_argument('--exit-when-idle', action='store_true', help='Stop once the queue is empty')
+
+    status = commands.add_parser('status', help='Show job states, or the history of one job')
+    status.add_argument('--job', type=int)
+
+    retry = commands.add_parser('retry', help='Queue a failed job again')
+    retry.add_argument('job', type=int)
+    return parser.parse_args()
+
+async def run_job(job, output_dir):
+    """Runs one episode into its job directory; returns (result, artifacts)"""
+    import pipeline
+    from artifact_store import ARTIFACT_STORE, sha256_file
+    from audio_metrics import create_metrics_sink, summarize_metrics
+
+    episode = job["episode"]
+    job_dir = os.path.join(output_dir, f"job-{job['id']}")
+    os.makedirs(job_dir, exist_ok=True)
+    output_path = os.path.join(job_dir, 'final_podcast.wav')
+    script_file = os.path.join(job_dir, 'podcast_script.txt')
+    metrics_sink = create_metrics_sink('memory')
+    config = episode_config(episode, metrics_sink)
+
+    # On a later attempt the stage graph skips what earlier attempts finished and resumes their synthesis
+    run = pipeline.run_cached_pipeline if ARTIFACT_STORE else pipeline.run_pipeline
+    start = time.perf_counter()
+    result = await run(episode["sources"], output_path, config, script_file=script_file)
+    metrics_sink.close()
+
+    files = {"audio": output_path, "script": script_file}
+    if config.pretranslate:
+        files["translated_script"] = pipeline.translated_script_path(script_file, config.language)
+    artifacts = {name: (path, sha256_file(path)) for name, path in files.items() if os.path.exists(path)}
+    return {
+        "wall_seconds": round(time.perf_counter() - start, 2),
+        "stage_seconds": {stage: round(seconds, 2) for stage, seconds in result.stage_seconds.items()},
+        "cached_stages": result.cached_stages,
+        "audio": summarize_metrics(metrics_sink.records) if metrics_sink.records else {},
+    }, artifacts
+
+async def keep_lease(queue, job_id, worker):
+    """Renews the job's lease until cancelled; returns only if another worker took the job over"""
+    while True:
+        await asyncio.sleep(queue.lease_seconds / 3)
+        try:
+            renewed = await asyncio.to_thread(queue.heartbeat, job_id, worker)
+        except Exception as e:
+            # A busy or briefly unavailable database is not a lost lease; try again on the next beat
+            print(f"[job {job_id}] could not renew lease ({type(e).__name__}: {e}), retrying")
+            continue
+        if not renewed:
+            return
+
+async def process(queue, job, worker, output_dir):
+    """Runs a claimed job under its lease and records how it ended"""
+    label = f"[job {job['id']}] {job['episode']['id']}"
+    job_task = asyncio.create_task(run_job(job, output_dir))
+    lease_task = asyncio.create_task(keep_lease(queue, job["id"], worker))
+    try:
+        await asyncio.wait({job_task, lease_task}, return_when=asyncio.FIRST_COMPLETED)
+        if not job_task.done():
+            job_task.cancel()
+            print(f"{label}: lease lost to another worker, stopped")
+            return
+        result, artifacts = job_task.result()
+        if "audio" not in artifacts:
+            raise RuntimeError("the run produced no audio file")
+    except asyncio.CancelledError:
+        job_task.cancel()
+        # Shutting down: hand the job back right away instead of waiting for the lease to expire
+        queue.release(job["id"], worker, "worker stopped")
+        print(f"{label}: released")
+        raise
+    except Exception as e:
+        await asyncio.to_thread(queue.fail, job["id"], worker, f"{type(e).__name__}: {e}")
+        print(f"{label}: failed on attempt {job['attempt']}: {type(e).__name__}: {e}")
+        return
+    finally:
+        lease_task.cancel()
+
+    if await asyncio.to_thread(queue.complete, job["id"], worker, result, artifacts):
+        print(f"{label}: completed in {result['wall_seconds']}s -> {artifacts['audio'][0]}")
+    else:
+        print(f"{label}: finished after its lease was lost; result discarded")
+
+async def work(queue, parallel=2, output_dir=JOB_OUTPUT_DIR, poll_seconds=JOB_POLL_SECONDS, exit_when_idle=False):
+    """Claims jobs whenever a slot is free; several worker processes can share one queue file"""
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except (NotImplementedError, RuntimeError):
+        pass
+    print(f"Worker {worker} running up to {parallel} job(s) from {queue.path}")
+
+    running = set()
+    while True:
+        while len(running) < parallel:
+            job = await asyncio.to_thread(queue.claim, worker)
+            if job is None:
+                break
+            print(f"[job {job['id']}] {job['episode']['id']}: started (attempt {job['attempt']})")
+            running.add(asyncio.create_task(process(queue, job, worker, output_dir)))
+
+        if not running:
+            if exit_when_idle:
+                return
+            await asyncio.sleep(poll_seconds)
+            continue
+        _, running = await asyncio.wait(running, timeout=poll_seconds, return_when=asyncio.FIRST_COMPLETED)
+
+def print_status(queue, job_id=None):
+    if job_id is None:
+        print(", ".join(f"{state} {count}" for state, count in queue.counts().items()))
+        for job in queue.jobs():
+            episode = json.loads(job["episode"])
+            print(f"  {job['id']:5} {episode['id']:20} {job['state']:10} attempts {job['attempts']}"
+                  + (f"  {job['error']}" if job["error"] else ""))
+        return
+    for event in queue.events(job_id):
+        at = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event["at"]))
+        print(f"  {at} {event['state']:10} {event['worker'] or '':30} {event['detail'] or ''}")
+    for artifact in queue.artifacts(job_id):
+        print(f"  {artifact['name']:18} {artifact['path']} ({artifact['sha256'][:12]})")
+
+def main():
+    args = parse_arguments()
+    queue = JobQueue(args.db)
+    if args.command == 'enqueue':
+        ids = [queue.enqueue(episode) for episode in load_manifest(args.manifest)]
+        print(f"Queued {len(ids)} job(s): {', '.join(map(str, ids))}")
+    elif args.command == 'work':
+        try:
+            asyncio.run(work(queue, args.parallel, args.output_dir, args.poll_seconds, args.exit_when_idle))
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            print("Worker stopped")
+    elif args.command == 'status':
+        print_status(queue, args.job)
+    elif args.command == 'retry':
+        print(f"Job {args.job} queued again" if queue.retry(args.job) else f"Job {args.job} is not failed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# mock_live_server.py
+
+import argparse
+import array
+import asyncio
+import base64
+import json
+import math
+import random
+import zlib
+from websockets.asyncio.server import serve
+
+SAMPLE_RATE = 24000
+PAUSE_CUE = "..."
+
+class MockLiveServer:
+    """Local stand-in for the Live API BidiGenerateContent websocket used by AudioGenerator.
+
+    Every text turn is answered with deterministic synthetic PCM (a tone whose pitch
+    depends on the text and whose length follows the text length), streamed back as
+    base64 inlineData chunks and closed with turnComplete.
+    """
+
+    def __init__(self, host='localhost', port=8765, latency=0.0, chunk_size=4096,
+                 throughput=0.0, chars_per_second=14.0, ack_chars=2000,
+                 disconnect_every=0, disconnect_rate=0.0, seed=0):
+        self.host = host
+        self.port = port
+        self.latency = latency                  # Seconds before the first audio chunk of a turn
+        self.chunk_size = chunk_size            # PCM bytes per inlineData chunk
+        self.throughput = throughput            # Audio seconds streamed per wall second (0 = unlimited)
+        self.chars_per_second = chars_per_second
+        self.ack_chars = ack_chars              # Turns longer than this are priming turns and get a short reply
+        self.disconnect_every = disconnect_every
+        self.disconnect_rate = disconnect_rate
+        self.random = random.Random(seed)
+
+        self.stats = {"sessions": 0, "turns": 0, "chunks": 0, "bytes": 0, "disconnects": 0}
+        self.server = None
+
+    @property
+    def uri(self):
+        return f"ws://{self.host}:{self.port}"
+
+    async def __aenter__(self):
+        self.server = await serve(self.handle_session, self.host, self.port)
+        if self.port == 0:
+            self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def synthesize(self, text):
+        """Returns mono 16-bit PCM for a turn; pause cues become silence"""
+        if len(text) > self.ack_chars:
+            text = "Got it, ready for the first line."
+
+        pcm = array.array('h')
+        pieces = [piece.strip() for piece in text.split(PAUSE_CUE)]
+        frequency = 180 + zlib.crc32(text.encode('utf-8')) % 220
+        for i, piece in enumerate(pieces):
+            if i > 0:
+                pcm.extend([0] * int(SAMPLE_RATE * 0.4))
+            if not piece:
+                continue
+            samples = int(SAMPLE_RATE * max(len(piece) / self.chars_per_second, 0.3))
+            step = 2 * math.pi * frequency / SAMPLE_RATE
+            pcm.extend(int(12000 * math.sin(step * n)) for n in range(samples))
+        return pcm.tobytes()
+
+    def should_disconnect(self):
+        if self.disconnect_every and self.stats["turns"] % self.disconnect_every == 0:
+            return True
+        return self.disconnect_rate > 0 and self.random.random() < self.disconnect_rate
+
+    async def stream_turn(self, ws, text):
+        pcm = self.synthesize(text)
+        await asyncio.sleep(self.latency)
+
+        chunk_seconds = self.chunk_size / 2 / SAMPLE_RATE
+        for start in range(0, len(pcm), self.chunk_size):
+            chunk = pcm[start:start + self.chunk_size]
+            message = {
+                "serverContent": {
+                    "modelTurn": {
+                        "parts": [{
+                            "inlineData": {
+                                "mimeType": f"audio/pcm;rate={SAMPLE_RATE}",
+                                "data": base64.b64encode(chunk).decode('ascii'),
+                            }
+                        }]
+                    }
+                }
+            }
+            await ws.send(json.dumps(message))
+            self.stats["chunks"] += 1
+            self.stats["bytes"] += len(chunk)
+            if self.throughput:
+                await asyncio.sleep(chunk_seconds / self.throughput)
+
+        await ws.send(json.dumps({"serverContent": {"turnComplete": True}}))
+
+    async def handle_session(self, ws):
+        self.stats["sessions"] += 1
+        setup = json.loads(await ws.recv())
+        if "setup" not in setup:
+            await ws.close(code=1008, reason="Expected setup message")
+            return
+        await ws.send(json.dumps({"setupComplete": {}}))
+
+        async for raw_message in ws:
+            message = json.loads(raw_message)
+            content = message.get("client_content") or message.get("clientContent")
+            if not content:
+                continue
+
+            text = " ".join(
+                part.get("text", "")
+                for turn in content.get("turns", [])
+                for part in turn.get("parts", [])
+            )
+            self.stats["turns"] += 1
+            if self.should_disconnect():
+                self.stats["disconnects"] += 1
+                await ws.close(code=1011, reason="Injected disconnect")
+                return
+            await self.stream_turn(ws, text)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Run a mock Live API websocket server.")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds before the first chunk of each turn')
+    parser.add_argument('--chunk-size', type=int, default=4096, help='PCM bytes per chunk')
+    parser.add_argument('--throughput', type=float, default=0.0, help='Audio seconds per wall second (0 = unlimited)')
+    parser.add_argument('--disconnect-every', type=int, default=0, help='Drop the connection every N turns')
+    parser.add_argument('--disconnect-rate', type=float, default=0.0, help='Probability of dropping the connection per turn')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+async def main():
+    args = parse_arguments()
+    server = MockLiveServer(
+        host=args.host, port=args.port, latency=args.latency, chunk_size=args.chunk_size,
+        throughput=args.throughput, disconnect_every=args.disconnect_every,
+        disconnect_rate=args.disconnect_rate, seed=args.seed)
+    async with server:
+        print(f"Mock Live API listening on {server.uri} (set LIVE_API_URI={server.uri})")
+        await asyncio.Future()
+
+if __name__ == "__main__":
+    asyncio.run(main())
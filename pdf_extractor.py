@@ -0,0 +1,65 @@
+# pdf_extractor.py
+
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', str(os.cpu_count() or 1)))
+PDF_PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', '16'))
+# Below this page count a private process pool costs more to start than it saves
+PDF_PARALLEL_MIN_PAGES = 32
+
+def count_pages(pdf_path):
+    import PyPDF2
+    with open(pdf_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+def extract_page_range(pdf_path, start, stop):
+    """Extracts pages [start, stop) and returns (page_number, text, seconds) for each"""
+    import PyPDF2
+    pages = []
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for page_number in range(start, stop):
+            page_start = time.perf_counter()
+            text = reader.pages[page_number].extract_text() or ""
+            pages.append((page_number, text, time.perf_counter() - page_start))
+    return pages
+
+def iter_pdf_pages(pdf_path, executor=None, workers=PDF_WORKERS, pages_per_task=PDF_PAGES_PER_TASK):
+    """Yields (page_number, text, seconds) in page order.
+
+    Page ranges are extracted in a process pool (the given executor, or a private one for
+    large documents) and at most two ranges per worker are in flight at a time, so pages
+    stream out as soon as the ranges before them are done.
+    """
+    page_count = count_pages(pdf_path)
+    if executor is None and (workers <= 1 or page_count < PDF_PARALLEL_MIN_PAGES):
+        yield from extract_page_range(pdf_path, 0, page_count)
+        return
+
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    ranges = deque((start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task))
+    in_flight = deque()
+    try:
+        while ranges or in_flight:
+            while ranges and len(in_flight) < workers * 2:
+                start, stop = ranges.popleft()
+                in_flight.append(pool.submit(extract_page_range, pdf_path, start, stop))
+            yield from in_flight.popleft().result()
+    finally:
+        for future in in_flight:
+            future.cancel()
+        if executor is None:
+            pool.shutdown()
+
+def extract_pdf_text(pdf_path, executor=None, timings=None):
+    """Returns the text of every page; per-page (page_number, seconds) go into timings when given"""
+    buffer = io.StringIO()
+    for page_number, text, seconds in iter_pdf_pages(pdf_path, executor):
+        buffer.write(text)
+        if timings is not None:
+            timings.append((page_number, seconds))
+    return buffer.getvalue()
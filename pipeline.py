@@ -0,0 +1,398 @@
+# pipeline.py
+
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, field, replace
+import generate_audio
+import generate_script
+import priming_context
+import script_translation
+import turn_planner
+from artifact_store import ArtifactStore, sha256_bytes
+from script_cache import check_cache_mode
+from stage_dag import Stage, StageGraph
+
+DEFAULT_LANGUAGE = generate_audio.DEFAULT_LANGUAGE
+
+class PipelineError(RuntimeError):
+    """A stage produced nothing the next stage could use"""
+
+@dataclass
+class PipelineConfig:
+    language: str = DEFAULT_LANGUAGE
+    voice_a: str = generate_audio.VOICE_A
+    voice_b: str = generate_audio.VOICE_B
+    script_mode: str = generate_script.SCRIPT_MODE
+    script_format: str = generate_script.SCRIPT_FORMAT
+    script_cache: str = generate_script.SCRIPT_CACHE
+    token_budget: int = generate_script.SCRIPT_TOKEN_BUDGET
+    pretranslate: bool = script_translation.PRETRANSLATE
+    metrics_sink: object = field(default=None, repr=False)
+
+@dataclass
+class IngestedContent:
+    text: str
+    sources: list          # one ingest result per source spec, in input order
+    errors: list
+
+@dataclass
+class Script:
+    text: str              # cleaned "Speaker A:" / "Speaker B:" lines
+    usage: dict            # token usage of the calls made for it; empty on a cache hit
+    language: str = None   # set once the text has been translated; None while in the source language
+
+@dataclass
+class SynthesizedAudio:
+    line_files: list       # one WAV per script line, in conversation order
+    work_dir: str
+
+@dataclass
+class Episode:
+    output_path: str
+    script: Script
+    stage_seconds: dict = field(default_factory=dict)
+    cached_stages: list = field(default_factory=list)   # stages skipped because their inputs were unchanged
+
+async def ingest(source_specs):
+    """Fetches and parses all sources concurrently and combines them into one text"""
+    results = await generate_script.ingest_sources_async(source_specs)
+    for result in results:
+        if not result["error"]:
+            print(f"Ingested {result['type']} source {result['location']} in {result['seconds']:.2f}s")
+    print(generate_script.content_cache_report())
+    errors = [f"{r['type']}:{r['location']}: {r['error']}" for r in results if r["error"]]
+    text = generate_script.combine_ingested_content(results)
+    if not text.strip():
+        raise PipelineError("No content could be read from the sources")
+    return IngestedContent(text, results, errors)
+
+def write_script(content, config=None):
+    """Generates and cleans the podcast script; blocking, run it in a thread from async code"""
+    config = config or PipelineConfig()
+    usage = {}
+    raw = generate_script.create_podcast_script(
+        content.text, config.script_mode, config.token_budget, report=usage,
+        cache_mode=config.script_cache, script_format=config.script_format)
+    if not raw:
+        raise PipelineError("Script generation failed")
+    return Script(generate_script.clean_podcast_script(raw), usage)
+
+def translate(script, config=None):
+    """Translates the script into config.language once, as text calls; blocking, run it in a thread"""
+    config = config or PipelineConfig()
+    model = generate_script.create_script_model()
+    text, report = script_translation.translate_script(
+        model, script.text, config.language, generate_script.SCRIPT_MODEL, config.script_cache)
+    script_translation.print_translation_report(report)
+    if text is None:
+        raise PipelineError(f"Translation into {config.language} failed")
+    return Script(text, model.usage, config.language)
+
+def audio_instructions(script, config):
+    """Translated scripts only need narrating; others are translated by the audio sessions as they speak"""
+    template_file = generate_audio.NARRATION_TEMPLATE_FILE if script.language else generate_audio.AUDIO_TEMPLATE_FILE
+    return generate_audio.render_audio_instructions(config.language, template_file)
+
+def translated_script_path(script_file, language):
+    """podcast_script.txt -> podcast_script_es.txt, named like the per-language outputs of render_languages"""
+    return language_output_path(script_file, generate_audio.language_code(language))
+
+def reviewed_script(script, script_file):
+    """The script as left in script_file after the review pause, so hand edits reach synthesis"""
+    if not script_file or not os.path.exists(script_file):
+        return script
+    with open(script_file, 'r', encoding='utf-8') as f:
+        text = f.read()
+    return script if text == script.text else replace(script, text=text)
+
+async def synthesize(script, work_dir, config=None, system_instructions=None, turn_limiter=None):
+    """Synthesizes every script line into work_dir; the instructions are rendered for config.language unless given"""
+    config = config or PipelineConfig()
+    if system_instructions is None:
+        system_instructions = audio_instructions(script, config)
+    line_files = await generate_audio.synthesize_script(
+        script.text, system_instructions, work_dir, config.voice_a, config.voice_b, config.metrics_sink,
+        turn_limiter, script.language)
+    return SynthesizedAudio(line_files, work_dir)
+
+def assemble(audio, output_path):
+    """Joins the line files into the final podcast"""
+    generate_audio.combine_audio_files(audio.line_files, output_path, silence_duration_ms=50)
+    print(f"\nFinal podcast audio created: {output_path}")
+    return output_path
+
+async def run_pipeline(source_specs, output_path="final_podcast.wav", config=None, review=None,
+                       script_file=None):
+    """Runs ingest -> script -> synthesize -> assemble in this process and returns the Episode.
+
+    review, if given, is called with the Script before synthesis; returning False stops the run
+    (and run_pipeline returns None). script_file, if given, receives a copy of the script, and edits
+    made to it (or to the translated copy) during the review are what gets synthesized.
+    """
+    config = config or PipelineConfig()
+    seconds = {}
+
+    start = time.perf_counter()
+    content = await ingest(source_specs)
+    seconds["ingest"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    script = await asyncio.to_thread(write_script, content, config)
+    seconds["script"] = time.perf_counter() - start
+    if script_file:
+        with open(script_file, 'w', encoding='utf-8') as f:
+            f.write(script.text)
+    if config.pretranslate:
+        start = time.perf_counter()
+        script = await asyncio.to_thread(translate, script, config)
+        seconds["translate"] = time.perf_counter() - start
+        if script_file:
+            with open(translated_script_path(script_file, config.language), 'w', encoding='utf-8') as f:
+                f.write(script.text)
+    if review:
+        if not await asyncio.to_thread(review, script):
+            return None
+        narrated_file = translated_script_path(script_file, config.language) if config.pretranslate and script_file \
+            else script_file
+        script = reviewed_script(script, narrated_file)
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory(dir=script_dir) as work_dir:
+        start = time.perf_counter()
+        audio = await synthesize(script, work_dir, config)
+        seconds["synthesize"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        assemble(audio, output_path)
+        seconds["assemble"] = time.perf_counter() - start
+
+    return Episode(output_path, script, seconds)
+
+def language_output_path(output_path, code):
+    """final_podcast.wav -> final_podcast_es.wav"""
+    root, extension = os.path.splitext(output_path)
+    return f"{root}_{code}{extension}"
+
+async def render_languages(script, languages, output_path="final_podcast.wav", config=None,
+                           max_inflight_turns=generate_audio.MAX_INFLIGHT_TURNS, script_file=None):
+    """Renders one script in every (code, language) concurrently and returns {code: Episode}.
+
+    Each language gets its own primed sessions; all of them draw turns from one shared limit, so
+    the languages progress line by line together instead of one whole render after another.
+    A failed language does not stop the others. With config.pretranslate, each language is
+    translated first (written next to script_file, if given).
+    """
+    config = config or PipelineConfig()
+    turn_limiter = asyncio.Semaphore(max_inflight_turns)
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    async def render(code, language):
+        variant = replace(config, language=language)
+        seconds = {}
+        variant_script = script
+        if config.pretranslate:
+            start = time.perf_counter()
+            variant_script = await asyncio.to_thread(translate, script, variant)
+            seconds["translate"] = time.perf_counter() - start
+            if script_file:
+                with open(language_output_path(script_file, code), 'w', encoding='utf-8') as f:
+                    f.write(variant_script.text)
+
+        start = time.perf_counter()
+        path = language_output_path(output_path, code)
+        with tempfile.TemporaryDirectory(dir=script_dir) as work_dir:
+            audio = await synthesize(variant_script, work_dir, variant, turn_limiter=turn_limiter)
+            assemble(audio, path)
+        seconds["synthesize+assemble"] = time.perf_counter() - start
+        return Episode(path, variant_script, seconds)
+
+    results = await asyncio.gather(*(render(code, language) for code, language in languages), return_exceptions=True)
+    episodes = {}
+    for (code, language), result in zip(languages, results):
+        if isinstance(result, Exception):
+            print(f"{language} render failed: {type(result).__name__}: {result}")
+        else:
+            episodes[code] = result
+    if not episodes:
+        raise PipelineError("Every language render failed")
+    return episodes
+
+async def run_multilingual_pipeline(source_specs, languages, output_path="final_podcast.wav", config=None,
+                                    review=None, script_file=None):
+    """Ingests and scripts once, then renders every language variant concurrently; returns {code: Episode}"""
+    config = config or PipelineConfig()
+    seconds = {}
+
+    start = time.perf_counter()
+    content = await ingest(source_specs)
+    seconds["ingest"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    script = await asyncio.to_thread(write_script, content, config)
+    seconds["script"] = time.perf_counter() - start
+    if script_file:
+        with open(script_file, 'w', encoding='utf-8') as f:
+            f.write(script.text)
+    if review:
+        if not await asyncio.to_thread(review, script):
+            return None
+        script = reviewed_script(script, script_file)
+
+    episodes = await render_languages(script, languages, output_path, config, script_file=script_file)
+    for episode in episodes.values():
+        episode.stage_seconds = {**seconds, **episode.stage_seconds}
+    return episodes
+
+async def run_streaming_pipeline(source_specs, output_path="final_podcast.wav", config=None,
+                                 script_file="podcast_script.txt"):
+    """Like run_pipeline, but script lines go to the audio sessions while the script is still being written"""
+    config = config or PipelineConfig()
+    seconds = {}
+
+    start = time.perf_counter()
+    content = await ingest(source_specs)
+    seconds["ingest"] = time.perf_counter() - start
+
+    lines = []
+
+    def script_lines():
+        for line in generate_script.stream_podcast_script(
+                content.text, config.script_mode, config.token_budget, config.script_cache, config.script_format):
+            lines.append(line)
+            yield line
+
+    start = time.perf_counter()
+    await generate_audio.stream_script_to_audio(
+        script_lines(), generate_audio.render_audio_instructions(config.language), output_path, script_file,
+        config.voice_a, config.voice_b, config.metrics_sink)
+    seconds["script+synthesize+assemble"] = time.perf_counter() - start
+    return Episode(output_path, Script("\n".join(lines), {}), seconds)
+
+def synthesis_settings(voice):
+    """Everything besides the script and instructions that changes a speaker's audio"""
+    settings = {
+        "voice": voice,
+        "sentence_chunk_chars": turn_planner.SENTENCE_CHUNK_CHARS,
+        "sentence_gap_ms": turn_planner.SENTENCE_GAP_MS,
+        "batch_short_line_chars": turn_planner.BATCH_SHORT_LINE_CHARS,
+        "batch_max_lines": turn_planner.BATCH_MAX_LINES,
+        "batch_min_pause_ms": turn_planner.BATCH_MIN_PAUSE_MS,
+        "max_resynth_rounds": generate_audio.MAX_RESYNTH_ROUNDS,
+    }
+    # Only added when compacting, so that full-script priming keeps its existing stage keys
+    if priming_context.PRIMING_CONTEXT != 'full':
+        settings["priming"] = [priming_context.PRIMING_CONTEXT, priming_context.PRIMING_TOKEN_BUDGET]
+    return settings
+
+def build_episode_graph(source_specs, config, store):
+    """ingest -> script [-> translate] -> speaker_a / speaker_b (with instructions) -> assemble, keyed by content hashes"""
+    # The mode also decides whether the script stages are reused, so a typo must not pass as 'refresh'
+    check_cache_mode(config.script_cache)
+    graph = StageGraph(store)
+    # The stage whose script the speakers narrate
+    narrated = "translate" if config.pretranslate else "script"
+
+    async def ingest_stage(ctx):
+        content = await ingest(source_specs)
+        return {"content_digest": store.put_text(content.text), "errors": content.errors}
+
+    async def script_stage(ctx):
+        text = store.get_text(ctx.inputs["ingest"]["content_digest"])
+        script = await asyncio.to_thread(write_script, IngestedContent(text, [], []), config)
+        return {"script_digest": store.put_text(script.text), "usage": script.usage}
+
+    async def translate_stage(ctx):
+        text = store.get_text(ctx.inputs["script"]["script_digest"])
+        script = await asyncio.to_thread(translate, Script(text, {}), config)
+        return {"script_digest": store.put_text(script.text), "usage": script.usage}
+
+    async def instructions_stage(ctx):
+        language = config.language if config.pretranslate else None
+        return {"instructions_digest": store.put_text(audio_instructions(Script("", {}, language), config))}
+
+    def speaker_stage(index, voice):
+        async def run(ctx):
+            full_script = store.get_text(ctx.inputs[narrated]["script_digest"])
+            system_instructions = store.get_text(ctx.inputs["instructions"]["instructions_digest"])
+            lines = generate_audio.parse_script(full_script)[index]
+            # The work directory outlives a crash, so a rerun only synthesizes the turns still missing
+            plan = await asyncio.to_thread(
+                generate_audio.prepare_speaker_dialogues, system_instructions, full_script, lines, voice, ctx.work_dir(),
+                language=config.language if config.pretranslate else None, speaker='AB'[index])
+            print(f"Processing Speaker {'AB'[index]}...")
+            await generate_audio.synthesize_speaker(plan, config.metrics_sink, resume=True)
+            return {"line_digests": [store.put_file(path) for path in plan["line_files"]]}
+        return run
+
+    async def assemble_stage(ctx):
+        line_files = generate_audio.interleave_output_files(
+            [store.path(digest) for digest in ctx.inputs["speaker_a"]["line_digests"]],
+            [store.path(digest) for digest in ctx.inputs["speaker_b"]["line_digests"]])
+        output_file = os.path.join(ctx.work_dir(), 'final_podcast.wav')
+        generate_audio.combine_audio_files(line_files, output_file, silence_duration_ms=50)
+        return {"audio_digest": store.put_file(output_file)}
+
+    script_params = {
+        "model": generate_script.SCRIPT_MODEL,
+        "template": sha256_bytes(generate_script.load_prompt_template().encode('utf-8')),
+        **generate_script.generation_settings(config.script_mode, config.token_budget, config.script_format),
+    }
+    graph.add(Stage("ingest", ingest_stage, always_run=True))
+    graph.add(Stage("script", script_stage, ("ingest",), script_params, cache=config.script_cache))
+    if config.pretranslate:
+        graph.add(Stage("translate", translate_stage, ("script",), {
+            "model": generate_script.SCRIPT_MODEL,
+            "language": config.language.lower(),
+            "prompt": sha256_bytes(script_translation.TRANSLATE_PROMPT.encode('utf-8')),
+            "chunk_lines": script_translation.TRANSLATION_CHUNK_LINES,
+        }, cache=config.script_cache))
+    graph.add(Stage("instructions", instructions_stage, always_run=True))
+    graph.add(Stage("speaker_a", speaker_stage(0, config.voice_a), (narrated, "instructions"),
+                    synthesis_settings(config.voice_a)))
+    graph.add(Stage("speaker_b", speaker_stage(1, config.voice_b), (narrated, "instructions"),
+                    synthesis_settings(config.voice_b)))
+    graph.add(Stage("assemble", assemble_stage, ("speaker_a", "speaker_b"), {"silence_ms": 50}))
+    return graph
+
+async def run_cached_pipeline(source_specs, output_path="final_podcast.wav", config=None, review=None,
+                              script_file=None, store=None):
+    """run_pipeline over the stage graph: stages whose inputs are unchanged are skipped, and an
+    interrupted synthesis resumes from the turns it had already finished"""
+    config = config or PipelineConfig()
+    store = store or ArtifactStore()
+    graph = build_episode_graph(source_specs, config, store)
+
+    outputs = await graph.run("script", "translate") if config.pretranslate else await graph.run("script")
+    script = Script(store.get_text(outputs["script"]["script_digest"]), outputs["script"]["usage"])
+    if script_file:
+        with open(script_file, 'w', encoding='utf-8') as f:
+            f.write(script.text)
+    if config.pretranslate:
+        script = Script(store.get_text(outputs["translate"]["script_digest"]), outputs["translate"]["usage"],
+                        config.language)
+        if script_file:
+            with open(translated_script_path(script_file, config.language), 'w', encoding='utf-8') as f:
+                f.write(script.text)
+    if review:
+        if not await asyncio.to_thread(review, script):
+            return None
+        narrated = "translate" if config.pretranslate else "script"
+        narrated_file = translated_script_path(script_file, config.language) if config.pretranslate and script_file \
+            else script_file
+        edited = reviewed_script(script, narrated_file)
+        if edited is not script:
+            # The edited text stands in for the stage's output, so the speakers are keyed on what was reviewed
+            graph.outputs[narrated] = {**graph.outputs[narrated], "script_digest": store.put_text(edited.text)}
+            script = edited
+
+    audio_digest = (await graph.run("assemble"))["assemble"]["audio_digest"]
+    shutil.copyfile(store.path(audio_digest), output_path)
+    print(f"\nFinal podcast audio created: {output_path}")
+    # Pruned only once the run no longer needs its artifacts; recently used ones are kept for concurrent runs
+    pruned = await asyncio.to_thread(store.prune)
+    if pruned:
+        print(f"Pruned {pruned} least recently used artifact(s) from {store.directory}")
+    return Episode(output_path, script, graph.timings, graph.cached)
@@ -6,9 +6,6 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QFont, QIcon
 from dotenv import load_dotenv
-import generate_script
-import generate_audio
-import generate_podcast
 
 class PodcastWorker(QThread):
     progress = pyqtSignal(int)
@@ -21,6 +18,10 @@ class PodcastWorker(QThread):
         
     def run(self):
         try:
+            # The pipeline modules pull in the Gemini SDK and audio stack, so the window opens before they load
+            import generate_script
+            import generate_audio
+
             # Generate script
             script = generate_script.generate_content(self.content_type, self.content)
             self.progress.emit(50)
@@ -0,0 +1,109 @@
+# priming_context.py
+
+import hashlib
+import os
+import time
+from disk_cache import DiskCache
+from token_budget import estimate_tokens, truncate_to_tokens
+
+# What each speaker session is primed with besides its instructions:
+# 'full' the whole script, 'window' the script lines that fit the budget,
+# 'summary' a generated summary of the episode plus as many script lines as still fit
+PRIMING_MODES = ('full', 'window', 'summary')
+PRIMING_CONTEXT = os.getenv('PRIMING_CONTEXT', 'full').lower()
+# Tokens of script context per session; the instructions come on top
+PRIMING_TOKEN_BUDGET = int(os.getenv('PRIMING_TOKEN_BUDGET', '2000'))
+# Share of the budget the summary may use in 'summary' mode
+SUMMARY_SHARE = 0.5
+PRIMING_CACHE_DIR = os.getenv('PRIMING_CACHE_DIR', os.path.join('.cache', 'priming'))
+PRIMING_CACHE_MAX_MB = int(os.getenv('PRIMING_CACHE_MAX_MB', '16'))
+
+priming_cache = DiskCache(PRIMING_CACHE_DIR, PRIMING_CACHE_MAX_MB * 1024 * 1024)
+
+SUMMARY_PROMPT = """Summarize this two-host podcast script for the voice actors who will perform it, in at most
+{words} words. Cover the topics in order, the tone, and the names, terms and figures they will have to pronounce.
+Write in the script's language. Output only the summary.
+
+Script:
+{script}"""
+
+WINDOW_NOTE = "(Excerpt: the script lines closest to where you start; the rest of the episode continues in the same way.)"
+
+def script_window(lines, max_tokens, focus=0):
+    """The lines around lines[focus] that fit max_tokens, widened alternately forwards and backwards"""
+    if not lines:
+        return []
+    start = end = min(max(focus, 0), len(lines) - 1)
+    used = estimate_tokens(lines[start])
+    if used > max_tokens:
+        return []
+    end += 1
+    grew = True
+    while grew:
+        grew = False
+        if end < len(lines) and used + estimate_tokens(lines[end]) <= max_tokens:
+            used += estimate_tokens(lines[end])
+            end += 1
+            grew = True
+        if start > 0 and used + estimate_tokens(lines[start - 1]) <= max_tokens:
+            start -= 1
+            used += estimate_tokens(lines[start])
+            grew = True
+    return lines[start:end]
+
+def line_positions(full_script, speaker):
+    """Index among the script's non-empty lines of each "Speaker <speaker>:" line, in order.
+
+    parse_script assigns lines to speakers by label in the same order, so the k-th entry is exactly
+    where that speaker's k-th line sits, however often its text repeats.
+    """
+    lines = [line for line in full_script.splitlines() if line.strip()]
+    return [index for index, line in enumerate(lines) if line.startswith(f"Speaker {speaker}:")]
+
+def summary_key(model_name, script, max_tokens):
+    digest = hashlib.sha256()
+    for part in (model_name, SUMMARY_PROMPT, str(max_tokens), script):
+        digest.update(hashlib.sha256(part.encode('utf-8')).digest())
+    return digest.hexdigest()
+
+def summarize_script(script, max_tokens):
+    """Generates (or loads the cached) episode summary; returns None if it cannot be generated"""
+    # Imported here so that audio-only runs with the default 'full' mode never load the Gemini SDK
+    import generate_script
+
+    key = summary_key(generate_script.SCRIPT_MODEL, script, max_tokens)
+    entry = priming_cache.get(key)
+    if entry is not None:
+        return entry["summary"]
+    try:
+        model = generate_script.create_script_model()
+        # Roughly 0.75 words per token
+        prompt = SUMMARY_PROMPT.format(words=max(20, int(max_tokens * 0.75)), script=script)
+        summary = model.generate_content(prompt).text.strip()
+    except Exception as e:
+        print(f"Could not summarize the script for priming ({e}), using a script window instead")
+        return None
+    priming_cache.put(key, {"summary": summary, "created_at": time.time()})
+    return summary
+
+def build_priming_context(full_script, mode=PRIMING_CONTEXT, max_tokens=PRIMING_TOKEN_BUDGET, focus=0):
+    """Returns the script context a session is primed with, kept within max_tokens unless mode is 'full'.
+
+    focus is the index of the non-empty script line the session starts at; the window is centred there.
+    """
+    if mode not in PRIMING_MODES:
+        raise ValueError(f"Unknown priming context: {mode} (expected one of {', '.join(PRIMING_MODES)})")
+    if mode == 'full' or estimate_tokens(full_script) <= max_tokens:
+        return full_script
+
+    lines = [line for line in full_script.splitlines() if line.strip()]
+    header = f"{WINDOW_NOTE}\n"
+    if mode == 'summary':
+        summary_tokens = int(max_tokens * SUMMARY_SHARE)
+        summary = summarize_script(full_script, summary_tokens)
+        if summary:
+            # The model may ignore the word limit; the window must keep the rest of the budget
+            summary = truncate_to_tokens(summary, summary_tokens)
+            header = f"Episode summary:\n{summary}\n\n{header}"
+    window = script_window(lines, max_tokens - estimate_tokens(header), focus)
+    return header + "\n".join(window)
@@ -0,0 +1,47 @@
+# script_cache.py
+
+import hashlib
+import json
+import os
+import time
+from disk_cache import DiskCache
+
+# 'on' reuses cached scripts, 'refresh' regenerates and overwrites them, 'off' bypasses the cache
+SCRIPT_CACHE_MODES = ('on', 'refresh', 'off')
+SCRIPT_CACHE = os.getenv('SCRIPT_CACHE', 'on').lower()
+SCRIPT_CACHE_DIR = os.getenv('SCRIPT_CACHE_DIR', os.path.join('.cache', 'scripts'))
+SCRIPT_CACHE_MAX_MB = int(os.getenv('SCRIPT_CACHE_MAX_MB', '64'))
+
+script_cache = DiskCache(SCRIPT_CACHE_DIR, SCRIPT_CACHE_MAX_MB * 1024 * 1024)
+
+def script_cache_key(model_name, prompt_template, content, generation_config):
+    """Hashes everything that determines the generated script"""
+    digest = hashlib.sha256()
+    for part in (model_name, prompt_template, content, json.dumps(generation_config, sort_keys=True)):
+        digest.update(hashlib.sha256(part.encode('utf-8')).digest())
+    return digest.hexdigest()
+
+def check_cache_mode(cache_mode):
+    if cache_mode not in SCRIPT_CACHE_MODES:
+        raise ValueError(f"Unknown script cache mode: {cache_mode} (expected one of {', '.join(SCRIPT_CACHE_MODES)})")
+
+def load_cached_script(key, cache_mode=SCRIPT_CACHE):
+    check_cache_mode(cache_mode)
+    if cache_mode != 'on':
+        return None
+    entry = script_cache.get(key)
+    if entry is not None:
+        print(f"Using cached script from {time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['created_at']))} "
+              f"(set SCRIPT_CACHE=refresh to regenerate)")
+    return entry
+
+def store_script(key, raw_script, cleaned_script, metadata, cache_mode=SCRIPT_CACHE):
+    check_cache_mode(cache_mode)
+    if cache_mode == 'off':
+        return
+    script_cache.put(key, {
+        "raw": raw_script,
+        "cleaned": cleaned_script,
+        "created_at": time.time(),
+        **metadata,
+    })
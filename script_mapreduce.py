@@ -0,0 +1,92 @@
+# script_mapreduce.py
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+# Roughly 30k tokens of source text per map call
+MAP_CHUNK_CHARS = int(os.getenv('MAP_CHUNK_CHARS', '120000'))
+SCRIPT_MAX_CONCURRENCY = int(os.getenv('SCRIPT_MAX_CONCURRENCY', '4'))
+MAX_REDUCE_ROUNDS = 3
+
+SECTION_BOUNDARY = re.compile(r'\n\s*\n|\n(?=#{1,6}\s)')
+
+MAP_PROMPT = """You are preparing research notes for a two-host podcast episode.
+Condense the excerpt below (part {index} of {total}) into detailed notes: key facts, figures, names,
+arguments, examples, open questions and surprising details worth discussing. Keep the excerpt's
+language. Output plain-text notes only.
+
+Excerpt:
+{chunk}"""
+
+REDUCE_PROMPT = """Merge the partial podcast research notes below (group {index} of {total}) into one set of notes.
+Remove repetition but keep every distinct fact, figure, example and surprising detail. Keep the notes'
+language. Output plain-text notes only.
+
+Notes:
+{chunk}"""
+
+def split_into_sections(content):
+    return [section.strip() for section in SECTION_BOUNDARY.split(content) if section.strip()]
+
+def split_oversized(section, max_chars):
+    """Splits a section that does not fit one chunk on line boundaries, then hard-wraps what is left"""
+    pieces = []
+    current = ""
+    for line in section.splitlines():
+        while len(line) > max_chars:
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and len(current) + 1 + len(line) > max_chars:
+            pieces.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        pieces.append(current)
+    return pieces
+
+def chunk_content(content, max_chars=MAP_CHUNK_CHARS):
+    """Packs whole sections into chunks of at most max_chars"""
+    chunks = []
+    current = ""
+    for section in split_into_sections(content):
+        parts = [section] if len(section) <= max_chars else split_oversized(section, max_chars)
+        for part in parts:
+            if current and len(current) + 2 + len(part) > max_chars:
+                chunks.append(current)
+                current = part
+            else:
+                current = f"{current}\n\n{part}" if current else part
+    if current:
+        chunks.append(current)
+    return chunks
+
+def generate_all(model, prompts, max_concurrency=SCRIPT_MAX_CONCURRENCY, **kwargs):
+    """Runs the prompts concurrently and returns the response texts in prompt order"""
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        return list(executor.map(lambda prompt: model.generate_content(prompt, **kwargs).text, prompts))
+
+def condense(model, chunks, prompt, max_concurrency):
+    prompts = [prompt.format(index=i + 1, total=len(chunks), chunk=chunk) for i, chunk in enumerate(chunks)]
+    return "\n\n".join(generate_all(model, prompts, max_concurrency))
+
+def reduce_to_notes(model, content, max_chars=MAP_CHUNK_CHARS, max_concurrency=SCRIPT_MAX_CONCURRENCY):
+    """Maps content to notes chunk by chunk, then merges the notes until they fit one chunk"""
+    if len(content) <= max_chars:
+        return content
+
+    chunks = chunk_content(content, max_chars)
+    print(f"Content too large for one call, summarizing {len(chunks)} chunks...")
+    notes = condense(model, chunks, MAP_PROMPT, max_concurrency)
+    for _ in range(MAX_REDUCE_ROUNDS):
+        if len(notes) <= max_chars:
+            break
+        notes = condense(model, chunk_content(notes, max_chars), REDUCE_PROMPT, max_concurrency)
+    return notes[:max_chars]
+
+def create_script_map_reduce(model, prompt_template, content, max_chars=MAP_CHUNK_CHARS,
+                             max_concurrency=SCRIPT_MAX_CONCURRENCY):
+    notes = reduce_to_notes(model, content, max_chars, max_concurrency)
+    prompt = f"{prompt_template}\n\nContent: {notes}"
+    return model.generate_content(prompt).text
@@ -0,0 +1,174 @@
+# script_segments.py
+
+import json
+import os
+import re
+import time
+from script_mapreduce import SCRIPT_MAX_CONCURRENCY, generate_all
+
+# Number of segments the outline call is asked for; each is written by its own concurrent call
+SCRIPT_SEGMENTS = int(os.getenv('SCRIPT_SEGMENTS', '6'))
+# Lines on each side of a join that the consistency pass may rewrite
+JOIN_CONTEXT_LINES = 4
+
+SPEAKER_LINE = re.compile(r"^(Speaker A:|Speaker B:)")
+JSON_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+SEGMENT_FIELDS = ('title', 'opens_with', 'hands_off_to_next')
+OUTLINE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "segments": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string"},
+                    "points": {"type": "array", "items": {"type": "string"}},
+                    "opens_with": {"type": "string"},
+                    "hands_off_to_next": {"type": "string"},
+                },
+                "required": ["title", "points"],
+            },
+        },
+    },
+    "required": ["title", "segments"],
+}
+OUTLINE_GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": OUTLINE_SCHEMA}
+
+OUTLINE_PROMPT = """You are planning a two-host podcast episode (Speaker A and Speaker B) about the content below.
+Split the episode into {segments} consecutive segments of similar length. Each segment will be written
+separately by a different writer who only sees your outline, so put every fact, figure, name and example
+a segment needs into its points.
+
+Return only JSON, no markdown, in this shape:
+{{"title": "...", "segments": [{{"title": "...", "points": ["..."], "opens_with": "...", "hands_off_to_next": "..."}}]}}
+
+"opens_with" says how the segment picks up from the previous one; "hands_off_to_next" says what question
+or teaser leads into the next one. The first segment opens the show and the last one closes it.
+Keep the content's language.
+
+Content:
+{content}"""
+
+SEGMENT_PROMPT = """{template}
+
+You are writing segment {index} of {total} of this episode: "{episode}".
+
+Full outline, for context only:
+{outline}
+
+Write ONLY segment {index}: "{title}".
+Cover these points:
+{points}
+
+Open by {opens_with}.
+{position}"""
+
+JOIN_PROMPT = """Below are the last lines of one podcast segment followed by the first lines of the next,
+written separately. Rewrite ONLY these lines so the conversation flows naturally across the join:
+remove repeated greetings, re-introductions and recaps, fix contradictions, and keep both speakers' voices.
+Keep roughly the same number of lines and the same language.
+Output only lines in the format "Speaker A: ..." or "Speaker B: ...".
+
+End of segment {index}:
+{tail}
+
+Start of segment {next_index}:
+{head}"""
+
+def parse_outline(text):
+    """Returns (episode title, segment list) from the outline call's JSON; raises ValueError if it is malformed"""
+    outline = json.loads(JSON_FENCE.sub("", text.strip()))
+    if not isinstance(outline, dict):
+        raise ValueError("Outline is not a JSON object")
+    if not isinstance(outline.get("title", ""), str) or not isinstance(outline.get("segments", []), list):
+        raise ValueError("Outline title or segments have the wrong type")
+    for segment in outline.get("segments", []):
+        if not isinstance(segment, dict):
+            raise ValueError("Outline segment is not a JSON object")
+        if any(not isinstance(segment.get(name, ""), str) for name in SEGMENT_FIELDS):
+            raise ValueError("Outline segment has a non-text title or transition")
+        points = segment.get("points", [])
+        if not isinstance(points, list) or not all(isinstance(point, str) for point in points):
+            raise ValueError("Outline segment points are not a list of strings")
+    segments = [segment for segment in outline.get("segments", []) if segment.get("points")]
+    if not segments:
+        raise ValueError("Outline has no segments")
+    return outline.get("title", ""), segments
+
+def speaker_lines(text):
+    return [line.strip() for line in text.splitlines() if SPEAKER_LINE.match(line.strip())]
+
+def segment_prompts(prompt_template, title, segments):
+    outline = "\n".join(f"{i + 1}. {segment.get('title', '')}" for i, segment in enumerate(segments))
+    prompts = []
+    for i, segment in enumerate(segments):
+        if i == len(segments) - 1:
+            position = "This is the last segment: wrap up the episode and say goodbye."
+        else:
+            position = (f"Do not close the show. End by leading into the next segment: "
+                        f"{segment.get('hands_off_to_next') or segments[i + 1].get('title', '')}.")
+        if i == 0:
+            opens_with = "welcoming listeners and introducing the topic"
+        else:
+            opens_with = segment.get('opens_with') or "picking up where the previous segment left off, without greetings"
+        prompts.append(SEGMENT_PROMPT.format(
+            template=prompt_template, index=i + 1, total=len(segments), episode=title, outline=outline,
+            title=segment.get('title', ''), points="\n".join(f"- {point}" for point in segment["points"]),
+            opens_with=opens_with, position=position))
+    return prompts
+
+def smooth_joins(model, segments, max_concurrency=SCRIPT_MAX_CONCURRENCY):
+    """Rewrites the lines around every join concurrently and stitches the segments together"""
+    # A segment lends at most half of its lines to each of its two joins
+    context = [min(JOIN_CONTEXT_LINES, len(lines) // 2) for lines in segments]
+    joins = range(len(segments) - 1)
+    prompts = [
+        JOIN_PROMPT.format(
+            index=i + 1, next_index=i + 2,
+            tail="\n".join(segments[i][len(segments[i]) - context[i]:]),
+            head="\n".join(segments[i + 1][:context[i + 1]]))
+        for i in joins
+    ]
+    rewritten = generate_all(model, prompts, max_concurrency) if prompts else []
+
+    script = []
+    for i, lines in enumerate(segments):
+        head = context[i] if i > 0 else 0
+        tail = context[i] if i < len(segments) - 1 else 0
+        script.extend(lines[head:len(lines) - tail])
+        if i < len(segments) - 1:
+            original = lines[len(lines) - tail:] + segments[i + 1][:context[i + 1]]
+            smoothed = speaker_lines(rewritten[i])
+            # Keep the original lines if the rewrite came back malformed or wildly off in length
+            if not smoothed or len(smoothed) > 2 * len(original) + 2:
+                smoothed = original
+            script.extend(smoothed)
+    return script
+
+def create_segmented_script(model, prompt_template, content, num_segments=SCRIPT_SEGMENTS, max_concurrency=None):
+    """Outlines the episode, writes all segments concurrently, then smooths the joins between them"""
+    start = time.perf_counter()
+    outline_text = model.generate_content(OUTLINE_PROMPT.format(segments=num_segments, content=content),
+                                          generation_config=OUTLINE_GENERATION_CONFIG).text
+    try:
+        title, segments = parse_outline(outline_text)
+    except ValueError as e:
+        print(f"Could not parse the outline ({e}), writing the script in one call instead")
+        return model.generate_content(f"{prompt_template}\n\nContent: {content}").text
+    outlined = time.perf_counter()
+    print(f"Outlined {len(segments)} segments in {outlined - start:.1f}s, writing them concurrently...")
+    # By default every segment is in flight at once, so writing takes about as long as one segment
+    max_concurrency = max_concurrency or len(segments)
+
+    texts = generate_all(model, segment_prompts(prompt_template, title, segments), max_concurrency)
+    written = time.perf_counter()
+    segment_lines = [lines for lines in (speaker_lines(text) for text in texts) if lines]
+    if not segment_lines:
+        raise ValueError("No segment produced any speaker lines")
+
+    script = smooth_joins(model, segment_lines, max_concurrency)
+    print(f"Segments written in {written - outlined:.1f}s, joins smoothed in {time.perf_counter() - written:.1f}s")
+    return "\n".join(script)
@@ -0,0 +1,110 @@
+# script_translation.py
+
+import hashlib
+import os
+import re
+import time
+from disk_cache import DiskCache
+from script_mapreduce import SCRIPT_MAX_CONCURRENCY, generate_all
+
+# 'on' translates the finished script once as text; the audio sessions then only narrate it
+PRETRANSLATE = os.getenv('PRETRANSLATE', 'off').lower() == 'on'
+TRANSLATION_CHUNK_LINES = int(os.getenv('TRANSLATION_CHUNK_LINES', '30'))
+# Lines before each chunk that are shown untranslated, so pronouns and terms stay consistent across chunks
+TRANSLATION_CONTEXT_LINES = 2
+TRANSLATION_CACHE_DIR = os.getenv('TRANSLATION_CACHE_DIR', os.path.join('.cache', 'translations'))
+TRANSLATION_CACHE_MAX_MB = int(os.getenv('TRANSLATION_CACHE_MAX_MB', '64'))
+# Chunks whose line count or speaker labels come back wrong are asked for again this many times
+TRANSLATION_RETRIES = 1
+
+translation_cache = DiskCache(TRANSLATION_CACHE_DIR, TRANSLATION_CACHE_MAX_MB * 1024 * 1024)
+
+TRANSLATE_PROMPT = """Translate these lines of a two-host podcast script into {language}.
+Translate them as natural spoken conversation, keeping names, figures and technical terms accurate.
+Keep each "Speaker A:" / "Speaker B:" label exactly as it is, untranslated, and return exactly {count}
+lines in the same order, one per input line. Output only the translated lines.
+{context}
+Lines:
+{lines}"""
+
+CONTEXT_NOTE = """
+The lines just before these, for context only (do not translate or repeat them):
+{lines}
+"""
+
+SPEAKER_LABEL = re.compile(r'^\s*(?:\*\*)?(Speaker [AB])(?:\*\*)?\s*:\s*(?:\*\*)?\s*(.*?)\s*$')
+
+def speaker_lines(script):
+    """The script's "Speaker X: ..." lines as (label, text) pairs"""
+    return [(match.group(1), match.group(2)) for line in script.splitlines() if (match := SPEAKER_LABEL.match(line))]
+
+def chunk_spans(count, size=TRANSLATION_CHUNK_LINES):
+    return [(start, min(count, start + size)) for start in range(0, count, max(1, size))]
+
+def translation_key(model_name, language, lines):
+    """Hashes everything that determines a chunk's translation"""
+    digest = hashlib.sha256()
+    for part in (model_name, TRANSLATE_PROMPT, language.lower(), *(f"{label}: {text}" for label, text in lines)):
+        digest.update(hashlib.sha256(part.encode('utf-8')).digest())
+    return digest.hexdigest()
+
+def translation_prompt(lines, start, end, language):
+    context = lines[max(0, start - TRANSLATION_CONTEXT_LINES):start]
+    context_note = CONTEXT_NOTE.format(lines="\n".join(f"{label}: {text}" for label, text in context)) if context else ""
+    return TRANSLATE_PROMPT.format(
+        language=language, count=end - start, context=context_note,
+        lines="\n".join(f"{label}: {text}" for label, text in lines[start:end]))
+
+def parse_translation(text, originals):
+    """Returns the translated (label, text) pairs, or None unless they match the originals line for line"""
+    translated = speaker_lines(text)
+    if len(translated) != len(originals):
+        return None
+    if any(label != original[0] or not line for (label, line), original in zip(translated, originals)):
+        return None
+    return translated
+
+def translate_script(model, script, language, model_name, cache_mode='on', max_concurrency=SCRIPT_MAX_CONCURRENCY):
+    """Translates a cleaned script into language in parallel chunks of lines, reusing cached chunks.
+
+    Returns (translated script, report); the script is None if a chunk could not be translated.
+    """
+    lines = speaker_lines(script)
+    spans = chunk_spans(len(lines))
+    keys = [translation_key(model_name, language, lines[start:end]) for start, end in spans]
+    results = [None] * len(spans)
+    if cache_mode == 'on':
+        for i, key in enumerate(keys):
+            entry = translation_cache.get(key)
+            if entry is not None:
+                results[i] = [tuple(line) for line in entry["lines"]]
+
+    pending = [i for i, result in enumerate(results) if result is None]
+    report = {"language": language, "lines": len(lines), "chunks": len(spans),
+              "cached": len(spans) - len(pending), "calls": 0, "failed": 0}
+    for _ in range(1 + TRANSLATION_RETRIES):
+        if not pending:
+            break
+        prompts = [translation_prompt(lines, *spans[i], language) for i in pending]
+        report["calls"] += len(prompts)
+        responses = generate_all(model, prompts, max_concurrency)
+        failed = []
+        for i, response in zip(pending, responses):
+            start, end = spans[i]
+            translated = parse_translation(response, lines[start:end])
+            if translated is None:
+                failed.append(i)
+                continue
+            results[i] = translated
+            if cache_mode != 'off':
+                translation_cache.put(keys[i], {"language": language, "lines": translated, "created_at": time.time()})
+        pending = failed
+
+    report["failed"] = len(pending)
+    if pending:
+        return None, report
+    return "\n".join(f"{label}: {text}" for chunk in results for label, text in chunk), report
+
+def print_translation_report(report):
+    print(f"Translation into {report['language']}: {report['lines']} lines in {report['chunks']} chunk(s), "
+          f"{report['cached']} cached, {report['calls']} call(s), {report['failed']} failed")
@@ -0,0 +1,101 @@
+# stage_dag.py
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from artifact_store import content_digests
+
+LOCK_POLL_SECONDS = 2
+
+@dataclass
+class Stage:
+    name: str
+    run: object            # async (StageContext) -> dict of JSON outputs
+    depends_on: tuple = ()
+    params: dict = field(default_factory=dict)
+    version: str = '1'
+    # Stages whose inputs cannot be hashed up front (e.g. fetching URLs) run every time;
+    # their outputs are still content-hashed, so unchanged results keep downstream stages cached
+    always_run: bool = False
+    # Same modes as the script cache: 'refresh' reruns and stores the new result, 'off' reruns without storing it
+    cache: str = 'on'
+
+@dataclass
+class StageContext:
+    store: object
+    key: str
+    inputs: dict           # outputs of each dependency, by stage name
+
+    def work_dir(self):
+        """Scratch directory that survives a crash and is removed once the stage completes"""
+        return self.store.work_dir(self.key)
+
+class StageGraph:
+    """Runs stages in dependency order, skipping any whose hashed inputs already have a stored result"""
+
+    def __init__(self, store):
+        self.store = store
+        self.stages = {}
+        self.outputs = {}
+        self.timings = {}
+        self.cached = []
+
+    def add(self, stage):
+        missing = [name for name in stage.depends_on if name not in self.stages]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown stage(s): {', '.join(missing)}")
+        self.stages[stage.name] = stage
+        return stage
+
+    def order(self, targets):
+        """Dependencies of targets in topological order (stages can only depend on earlier ones)"""
+        needed = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self.stages[name].depends_on)
+        return [name for name in self.stages if name in needed]
+
+    async def run(self, *targets):
+        """Brings targets (default: every stage) up to date and returns their outputs"""
+        targets = targets or tuple(self.stages)
+        for name in self.order(targets):
+            if name in self.outputs:
+                continue
+            stage = self.stages[name]
+            inputs = {dependency: self.outputs[dependency] for dependency in stage.depends_on}
+            # Only the content digests identify an input; side values like token usage would change the key
+            hashed = {dependency: content_digests(outputs) for dependency, outputs in inputs.items()}
+            key = self.store.stage_key(name, stage.version, stage.params, hashed)
+
+            if stage.always_run:
+                await self.execute(stage, key, inputs)
+                continue
+            # Another run with the same key (e.g. a second job worker) finishes first; its result is then reused
+            lock = self.store.stage_lock(key)
+            try:
+                if not lock.acquire():
+                    print(f"Stage {name}: waiting for another run with the same inputs")
+                    while not lock.acquire():
+                        await asyncio.sleep(LOCK_POLL_SECONDS)
+                record = self.store.lookup(key) if stage.cache == 'on' else None
+                if record is not None:
+                    print(f"Stage {name}: inputs unchanged, reusing stored result")
+                    self.outputs[name] = record["outputs"]
+                    self.cached.append(name)
+                    continue
+                await self.execute(stage, key, inputs)
+            finally:
+                lock.release()
+        return {name: self.outputs[name] for name in targets}
+
+    async def execute(self, stage, key, inputs):
+        start = time.perf_counter()
+        outputs = await stage.run(StageContext(self.store, key, inputs))
+        self.timings[stage.name] = time.perf_counter() - start
+        if stage.cache != 'off':
+            self.store.record(key, stage.name, outputs, self.timings[stage.name])
+        self.store.clear_work_dir(key)
+        self.outputs[stage.name] = outputs
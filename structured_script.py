@@ -0,0 +1,233 @@
+# structured_script.py
+
+import json
+import os
+import re
+from script_mapreduce import SCRIPT_MAX_CONCURRENCY, generate_all
+
+# 'text' asks for "Speaker A: ..." lines, 'json' asks for schema-constrained JSON turns
+SCRIPT_FORMATS = ('text', 'json')
+SCRIPT_FORMAT = os.getenv('SCRIPT_FORMAT', 'text').lower()
+MAX_TURN_CHARS = int(os.getenv('MAX_TURN_CHARS', '1500'))
+# Malformed turns are repaired together with this many valid neighbours on each side as context
+REPAIR_CONTEXT_TURNS = 1
+
+SPEAKERS = ('A', 'B')
+TURN_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "speaker": {"type": "string", "enum": list(SPEAKERS)},
+            "text": {"type": "string"},
+        },
+        "required": ["speaker", "text"],
+    },
+}
+STRUCTURED_GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": TURN_SCHEMA}
+
+STRUCTURED_NOTE = """
+<!-- Structured Output -->
+Return the dialogue as a JSON array of turns, each {"speaker": "A" or "B", "text": "..."}.
+"text" holds only the words spoken in that turn: no speaker labels, markdown, or stage directions."""
+
+REPAIR_PROMPT = """Some turns of a two-host podcast script are malformed. Rewrite only the turns marked FIX so they
+are valid, keeping their meaning and language, and keep the unmarked context turns unchanged.
+Return the same number of turns as given ({count}), as a JSON array of {{"speaker": "A" or "B", "text": "..."}}.
+
+Problems:
+{problems}
+
+Turns:
+{turns}"""
+
+LEADING_LABEL = re.compile(r'^\s*(\*\*)?speaker\s*[ab]\s*(\*\*)?\s*:\s*', re.IGNORECASE)
+# Markdown emphasis, a leading heading mark, bracketed cues and parenthesised stage directions;
+# a lone '#', '*' or '_' inside a word ("C#", "snake_case", "5*3") is ordinary text
+MARKUP = re.compile(r'\*\*[^*]+\*\*|^\s*#+\s|\[[^\]]*\]|\([^)]*(laugh|pause|music|sigh|chuckle)[^)]*\)', re.IGNORECASE)
+FIELD_PAIR = re.compile(r'"speaker"\s*:\s*"([^"]*)"\s*,\s*"text"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+def iter_json_turns(chunks):
+    """Incrementally decodes a streamed JSON array, yielding each turn object as soon as it is complete.
+
+    If the stream stops being valid JSON, turns that can still be recognised in the remainder are
+    salvaged and anything else is yielded as {"raw": ...} for the validator to flag.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    broken = False
+    for chunk in chunks:
+        buffer += chunk
+        if broken:
+            continue
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position >= len(buffer):
+                break
+            if not started:
+                if buffer[position] != '[':
+                    broken = True
+                    break
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                turn, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Most often the object is just incomplete; wait for more text
+                break
+            yield turn if isinstance(turn, dict) else {"raw": json.dumps(turn)}
+            position = end
+
+    remainder = buffer[position:].strip()
+    if not remainder or remainder == ']':
+        return
+    salvaged = False
+    for match in FIELD_PAIR.finditer(remainder):
+        salvaged = True
+        yield {"speaker": match.group(1), "text": json.loads(f'"{match.group(2)}"')}
+    if not salvaged:
+        yield {"raw": remainder}
+
+def normalize_turn(turn):
+    """Applies the fixes that need no model call: whitespace, label prefixes and speaker spelling"""
+    if "raw" in turn:
+        return turn
+    speaker = str(turn.get("speaker", "")).strip().upper().replace("SPEAKER", "").strip()
+    text = ' '.join(str(turn.get("text", "")).split())
+    return {"speaker": speaker, "text": LEADING_LABEL.sub("", text)}
+
+def validate_turn(turn):
+    """Returns the problems with a turn; an empty list means it can go straight to audio"""
+    if "raw" in turn:
+        return ["not a valid JSON turn"]
+    problems = []
+    if turn["speaker"] not in SPEAKERS:
+        problems.append(f"unknown speaker {turn['speaker']!r}")
+    if not turn["text"]:
+        problems.append("empty text")
+    elif MARKUP.search(turn["text"]):
+        problems.append("contains markup or stage directions")
+    if len(turn["text"]) > MAX_TURN_CHARS:
+        problems.append(f"longer than {MAX_TURN_CHARS} characters")
+    return problems
+
+def strip_markup(turn):
+    """The turn with its markup removed and emphasis unwrapped, or None if nothing speakable is left"""
+    if "raw" in turn or turn["speaker"] not in SPEAKERS:
+        return None
+    text = re.sub(r'\*\*([^*]+)\*\*', r'\1', turn["text"])
+    text = ' '.join(MARKUP.sub(' ', text).split())
+    return {"speaker": turn["speaker"], "text": text} if text else None
+
+def format_turn(turn):
+    return f"Speaker {turn['speaker']}: {turn['text']}"
+
+def repair_spans(problems_by_index, count):
+    """Groups malformed turn indices into spans, each widened by its context turns"""
+    spans = []
+    for index in sorted(problems_by_index):
+        start, end = max(0, index - REPAIR_CONTEXT_TURNS), min(count, index + REPAIR_CONTEXT_TURNS + 1)
+        if spans and start <= spans[-1][1]:
+            spans[-1][1] = max(spans[-1][1], end)
+        else:
+            spans.append([start, end])
+    return spans
+
+def repair_prompt(turns, problems_by_index, start, end):
+    listed = []
+    for i in range(start, end):
+        turn = turns[i]
+        marker = "FIX " if i in problems_by_index else ""
+        body = turn["raw"] if "raw" in turn else json.dumps(turn, ensure_ascii=False)
+        listed.append(f"{marker}{i - start + 1}. {body}")
+    problems = "\n".join(
+        f"{i - start + 1}: {', '.join(problems_by_index[i])}" for i in range(start, end) if i in problems_by_index)
+    return REPAIR_PROMPT.format(count=end - start, problems=problems, turns="\n".join(listed))
+
+def parse_repair(text, expected):
+    turns = [normalize_turn(turn) for turn in iter_json_turns([text])]
+    if len(turns) != expected or any(validate_turn(turn) for turn in turns):
+        return None
+    return turns
+
+def repair_turns(model, turns, max_concurrency=SCRIPT_MAX_CONCURRENCY):
+    """Re-asks the model only for the malformed spans of the turn table, concurrently.
+
+    Returns (turns, report). Turns that are still invalid after the repair keep their original text with
+    the markup stripped; only turns with no speaker or nothing left to say are dropped.
+    """
+    problems_by_index = {i: problems for i, turn in enumerate(turns) if (problems := validate_turn(turn))}
+    report = empty_repair_report(len(turns))
+    report["malformed"] = len(problems_by_index)
+    if not problems_by_index:
+        return turns, report
+
+    spans = repair_spans(problems_by_index, len(turns))
+    prompts = [repair_prompt(turns, problems_by_index, start, end) for start, end in spans]
+    report["repair_calls"] = len(prompts)
+    try:
+        responses = generate_all(model, prompts, max_concurrency, generation_config=STRUCTURED_GENERATION_CONFIG)
+    except Exception as e:
+        print(f"Repair calls failed: {e}")
+        responses = [""] * len(spans)
+
+    repaired = list(turns)
+    for (start, end), response in zip(spans, responses):
+        fixed = parse_repair(response, end - start)
+        if fixed is None:
+            continue
+        # Only the marked turns are replaced; valid context turns stay exactly as generated
+        for i in range(start, end):
+            if i in problems_by_index:
+                repaired[i] = fixed[i - start]
+                report["repaired"] += 1
+
+    table = []
+    for turn in repaired:
+        if validate_turn(turn):
+            turn = strip_markup(turn)
+            if turn is None:
+                report["dropped"] += 1
+                continue
+            report["stripped"] += 1
+        table.append(turn)
+    return table, report
+
+def empty_repair_report(turns=0):
+    return {"turns": turns, "malformed": 0, "repaired": 0, "stripped": 0, "dropped": 0, "repair_calls": 0}
+
+def print_repair_report(report):
+    print(f"Structured script: {report['turns']} turns, {report['malformed']} malformed, "
+          f"{report['repaired']} repaired in {report['repair_calls']} call(s), "
+          f"{report['stripped']} kept as stripped text, {report['dropped']} dropped")
+
+def iter_valid_turns(model, raw_turns, report):
+    """Validates streamed turns in order, repairing each malformed run with its neighbours as context"""
+    previous = None
+    run = []
+    for turn in map(normalize_turn, raw_turns):
+        report["turns"] += 1
+        if validate_turn(turn):
+            run.append(turn)
+            continue
+        if run:
+            yield from repair_run(model, previous, run, turn, report)
+            run = []
+        yield turn
+        previous = turn
+    if run:
+        yield from repair_run(model, previous, run, None, report)
+
+def repair_run(model, before, run, after, report):
+    context = ([before] if before else []) + run + ([after] if after else [])
+    table, run_report = repair_turns(model, context, max_concurrency=1)
+    for key in ("malformed", "repaired", "stripped", "dropped", "repair_calls"):
+        report[key] += run_report[key]
+    # The valid neighbours survive the repair, so they still sit at both ends of the table
+    yield from table[1 if before else 0:len(table) - (1 if after else 0)]
@@ -0,0 +1,122 @@
+# token_budget.py
+
+import os
+import re
+import threading
+from script_mapreduce import reduce_to_notes
+
+# Input budget for one script prompt (template + content); 0 disables budgeting
+SCRIPT_TOKEN_BUDGET = int(os.getenv('SCRIPT_TOKEN_BUDGET', '0'))
+# truncate: cut the tail, deduplicate: drop repeated paragraphs first, summarize: deduplicate, then condense
+BUDGET_STRATEGIES = ('truncate', 'deduplicate', 'summarize')
+BUDGET_STRATEGY = os.getenv('BUDGET_STRATEGY', 'deduplicate').lower()
+CHARS_PER_TOKEN = 4
+# Estimates this far from the limit are trusted; closer calls use the API's exact count
+EXACT_COUNT_MARGIN = 0.25
+
+PARAGRAPH_BOUNDARY = re.compile(r'\n\s*\n')
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def count_tokens(model, text, limit=None):
+    """Estimates tokens, asking the API for an exact count only when the estimate is close to the limit"""
+    estimate = estimate_tokens(text)
+    if model is None or (limit and abs(estimate - limit) > EXACT_COUNT_MARGIN * limit):
+        return estimate
+    try:
+        return model.count_tokens(text).total_tokens
+    except Exception:
+        return estimate
+
+def deduplicate_paragraphs(content):
+    """Drops paragraphs that repeat an earlier one, ignoring case and whitespace"""
+    seen = set()
+    kept = []
+    for paragraph in PARAGRAPH_BOUNDARY.split(content):
+        key = ' '.join(paragraph.lower().split())
+        if key and key in seen:
+            continue
+        seen.add(key)
+        kept.append(paragraph)
+    return "\n\n".join(kept)
+
+def truncate_to_tokens(content, max_tokens):
+    """Keeps whole paragraphs up to the budget, cutting the last one only if nothing else fits"""
+    max_chars = max(max_tokens, 0) * CHARS_PER_TOKEN
+    if len(content) <= max_chars:
+        return content
+    cut = content.rfind("\n\n", 0, max_chars)
+    return content[:cut if cut > 0 else max_chars]
+
+def fit_to_budget(model, prompt_template, content, budget=SCRIPT_TOKEN_BUDGET, strategy=BUDGET_STRATEGY):
+    """Shrinks content so that template plus content fit the budget; returns (content, report)"""
+    if strategy not in BUDGET_STRATEGIES:
+        raise ValueError(f"Unknown budget strategy: {strategy} (expected one of {', '.join(BUDGET_STRATEGIES)})")
+    template_tokens = count_tokens(model, prompt_template)
+    available = budget - template_tokens
+    if available <= 0:
+        raise ValueError(f"Token budget {budget} leaves no room for content: "
+                         f"the prompt template alone takes {template_tokens} tokens")
+    content_tokens = count_tokens(model, content, available)
+    report = {
+        "budget": budget,
+        "strategy": strategy,
+        "template_tokens": template_tokens,
+        "content_tokens_before": content_tokens,
+        "steps": [],
+    }
+
+    if content_tokens > available and strategy in ('deduplicate', 'summarize'):
+        content = deduplicate_paragraphs(content)
+        content_tokens = count_tokens(model, content, available)
+        report["steps"].append(("deduplicate", content_tokens))
+
+    if content_tokens > available and strategy == 'summarize':
+        content = reduce_to_notes(model, content, max_chars=available * CHARS_PER_TOKEN)
+        content_tokens = count_tokens(model, content, available)
+        report["steps"].append(("summarize", content_tokens))
+
+    if content_tokens > available:
+        content = truncate_to_tokens(content, available)
+        content_tokens = count_tokens(model, content, available)
+        report["steps"].append(("truncate", content_tokens))
+
+    report["content_tokens_after"] = content_tokens
+    return content, report
+
+class UsageTracker:
+    """Wraps a GenerativeModel and totals the token usage of every generate_content call"""
+
+    def __init__(self, model):
+        self.model = model
+        self.lock = threading.Lock()
+        self.usage = {"calls": 0, "input_tokens": 0, "output_tokens": 0}
+
+    def generate_content(self, prompt, *args, **kwargs):
+        response = self.model.generate_content(prompt, *args, **kwargs)
+        if not kwargs.get('stream'):
+            self.record(prompt, response)
+        return response
+
+    def record(self, prompt, response, text=None):
+        metadata = getattr(response, 'usage_metadata', None)
+        input_tokens = getattr(metadata, 'prompt_token_count', 0) or estimate_tokens(str(prompt))
+        output_tokens = getattr(metadata, 'candidates_token_count', 0) or estimate_tokens(
+            response.text if text is None else text)
+        with self.lock:
+            self.usage["calls"] += 1
+            self.usage["input_tokens"] += input_tokens
+            self.usage["output_tokens"] += output_tokens
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+def print_token_report(usage, budget_report=None):
+    if budget_report:
+        steps = ", ".join(f"{step} -> {tokens}" for step, tokens in budget_report["steps"]) or "none needed"
+        print(f"Token budget: {budget_report['budget']} (template {budget_report['template_tokens']}, "
+              f"content {budget_report['content_tokens_before']} -> {budget_report['content_tokens_after']}; "
+              f"{budget_report['strategy']}: {steps})")
+    print(f"Token usage: {usage['input_tokens']} input, {usage['output_tokens']} output "
+          f"over {usage['calls']} call(s)")
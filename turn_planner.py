@@ -0,0 +1,231 @@
+# turn_planner.py
+
+import os
+import re
+from pydub import AudioSegment
+from pydub.silence import detect_leading_silence
+from pydub.utils import audioop
+
+# Lines longer than this are split into sentence-sized sub-turns (0 disables splitting)
+SENTENCE_CHUNK_CHARS = int(os.getenv('SENTENCE_CHUNK_CHARS', '0'))
+SENTENCE_GAP_MS = int(os.getenv('SENTENCE_GAP_MS', '120'))
+EDGE_SILENCE_THRESHOLD_DBFS = -50.0
+
+# Consecutive lines up to this length are packed into one turn (0 disables batching)
+BATCH_SHORT_LINE_CHARS = int(os.getenv('BATCH_SHORT_LINE_CHARS', '0'))
+BATCH_MAX_LINES = int(os.getenv('BATCH_MAX_LINES', '4'))
+BATCH_PAUSE_CUE = " ... "
+BATCH_MIN_PAUSE_MS = int(os.getenv('BATCH_MIN_PAUSE_MS', '250'))
+PAUSE_FRAME_MS = 10
+PAUSE_LEVEL_RATIO = 0.1
+
+HAN_KANA_PATTERN = re.compile(r'[぀-ヿ㐀-䶿一-鿿]')
+DEVANAGARI_PATTERN = re.compile(r'[ऀ-ॿঀ-৿]')
+ARABIC_PATTERN = re.compile(r'[؀-ۿ]')
+
+# Sentence boundaries per writing system. Each match ends right after the terminator.
+BOUNDARY_PATTERNS = {
+    'han': re.compile(r'[。！？!?]+[」』”’）)]*'),
+    'indic': re.compile(r'[।॥!?]+["”’)]*(?=\s)'),
+    'arabic': re.compile(r'[.!?؟۔]+["”’)]*(?=\s)'),
+    'latin': re.compile(r'(?:\.\.\.|[.!?…])+["\'”’»)\]]*(?=\s)'),
+}
+
+ABBREVIATIONS = {
+    'english': {'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'vs', 'etc', 'e.g', 'i.e', 'inc', 'ltd', 'no', 'approx'},
+    'spanish': {'sr', 'sra', 'srta', 'dr', 'dra', 'ud', 'uds', 'etc', 'pág', 'núm'},
+    'german': {'dr', 'prof', 'hr', 'fr', 'z.b', 'bzw', 'usw', 'ca', 'nr', 'vgl', 'd.h'},
+    'french': {'m', 'mme', 'mlle', 'dr', 'etc', 'p.ex', 'cf', 'env'},
+}
+
+def detect_writing_system(text):
+    if HAN_KANA_PATTERN.search(text):
+        return 'han'
+    if DEVANAGARI_PATTERN.search(text):
+        return 'indic'
+    if ARABIC_PATTERN.search(text):
+        return 'arabic'
+    return 'latin'
+
+def split_sentences(text, language=None):
+    """Splits text into sentences using boundary rules for its writing system"""
+    system = detect_writing_system(text)
+    abbreviations = ABBREVIATIONS.get((language or 'english').lower(), ABBREVIATIONS['english'])
+
+    sentences = []
+    start = 0
+    for match in BOUNDARY_PATTERNS[system].finditer(text):
+        end = match.end()
+        if system == 'latin':
+            preceding_word = text[start:match.start()].split()[-1:] or ['']
+            if preceding_word[0].lower().rstrip('.') in abbreviations and match.group().startswith('.'):
+                continue
+            following = text[end:].lstrip()[:1]
+            if following and following.islower():
+                continue
+        sentence = text[start:end].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = end
+
+    remainder = text[start:].strip()
+    if remainder:
+        sentences.append(remainder)
+    return sentences
+
+def split_long_line(line, max_chars=SENTENCE_CHUNK_CHARS, language=None):
+    """Groups the sentences of a long line into sub-turns of at most max_chars"""
+    if not max_chars or len(line) <= max_chars:
+        return [line]
+
+    chunks = []
+    current = ""
+    separator = "" if detect_writing_system(line) == 'han' else " "
+    for sentence in split_sentences(line, language):
+        if current and len(current) + len(separator) + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current}{separator}{sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+def group_short_lines(speaker_lines, max_chars=BATCH_SHORT_LINE_CHARS, max_lines=BATCH_MAX_LINES):
+    """Groups line indices so that runs of consecutive short lines share one turn"""
+    groups = []
+    current = []
+    for i, line in enumerate(speaker_lines):
+        is_short = max_chars and len(line) <= max_chars
+        if is_short and len(current) < max_lines:
+            current.append(i)
+            continue
+        if current:
+            groups.append(current)
+        current = [i] if is_short else []
+        if not is_short:
+            groups.append([i])
+    if current:
+        groups.append(current)
+    return groups
+
+def plan_speaker_turns(priming_text, speaker_lines, voice, temp_dir, max_chunk_chars=SENTENCE_CHUNK_CHARS,
+                       language=None):
+    """Builds the session turns for one speaker and maps them back to per-line audio files.
+
+    language names the language the lines are written in, which picks the abbreviations sentence splitting skips.
+    """
+    plan = {
+        "voice": voice,
+        "lines": list(speaker_lines),
+        "dialogues": [priming_text],
+        "output_files": [os.path.join(temp_dir, f"speaker_{voice}_initial.wav")],
+        "line_files": [os.path.join(temp_dir, f"speaker_{voice}_{i}.wav") for i in range(len(speaker_lines))],
+        "segments": [[] for _ in speaker_lines],
+        "batches": [],
+        # The speaker line each session turn after the priming turn belongs to
+        "turn_lines": [],
+    }
+
+    for group in group_short_lines(speaker_lines):
+        if len(group) > 1:
+            # Batched lines are recovered later by splitting the turn on its pauses
+            batch_file = os.path.join(temp_dir, f"speaker_{voice}_batch_{group[0]}.wav")
+            plan["dialogues"].append(BATCH_PAUSE_CUE.join(speaker_lines[i] for i in group))
+            plan["output_files"].append(batch_file)
+            plan["batches"].append((batch_file, group))
+            plan["turn_lines"].append(group[0])
+            continue
+
+        i = group[0]
+        line_file = plan["line_files"][i]
+        chunks = split_long_line(speaker_lines[i], max_chunk_chars, language)
+        if len(chunks) == 1:
+            segment_files = [line_file]
+        else:
+            segment_files = [os.path.join(temp_dir, f"speaker_{voice}_{i}_{j}.wav") for j in range(len(chunks))]
+
+        plan["dialogues"].extend(chunks)
+        plan["output_files"].extend(segment_files)
+        plan["turn_lines"].extend([i] * len(chunks))
+        plan["segments"][i] = segment_files
+
+    return plan
+
+def trim_edge_silence(audio):
+    start = detect_leading_silence(audio, silence_threshold=EDGE_SILENCE_THRESHOLD_DBFS)
+    end = detect_leading_silence(audio.reverse(), silence_threshold=EDGE_SILENCE_THRESHOLD_DBFS)
+    if start + end >= len(audio):
+        return audio
+    return audio[start:len(audio) - end]
+
+def stitch_segments(plan, gap_ms=SENTENCE_GAP_MS):
+    """Joins sentence sub-turns back into one file per line with a consistent gap"""
+    gap = AudioSegment.silent(duration=gap_ms)
+    for line_file, segment_files in zip(plan["line_files"], plan["segments"]):
+        if not segment_files or segment_files == [line_file]:
+            continue
+        combined = AudioSegment.empty()
+        for j, segment_file in enumerate(segment_files):
+            segment = trim_edge_silence(AudioSegment.from_wav(segment_file))
+            combined += segment if j == 0 else gap + segment
+        combined.export(line_file, format="wav")
+
+def frame_levels(audio, frame_ms=PAUSE_FRAME_MS):
+    """RMS level of every frame_ms frame, read straight from the raw samples without slicing the segment"""
+    data = memoryview(audio.raw_data)
+    step = audio.frame_width * max(1, audio.frame_rate * frame_ms // 1000)
+    return [audioop.rms(data[start:start + step], audio.sample_width) for start in range(0, len(data), step)]
+
+def find_pauses(audio, min_pause_ms=BATCH_MIN_PAUSE_MS, frame_ms=PAUSE_FRAME_MS):
+    """Finds inner pauses in one pass over per-frame RMS levels, returned as (start_ms, end_ms)"""
+    levels = frame_levels(audio, frame_ms)
+    if not levels:
+        return []
+    threshold = max(levels) * PAUSE_LEVEL_RATIO
+
+    pauses = []
+    run_start = None
+    for i, level in enumerate(levels + [threshold + 1]):
+        if level < threshold:
+            if run_start is None:
+                run_start = i
+            continue
+        if run_start is not None:
+            is_inner = run_start > 0 and i < len(levels)
+            if is_inner and (i - run_start) * frame_ms >= min_pause_ms:
+                pauses.append((run_start * frame_ms, i * frame_ms))
+            run_start = None
+    return pauses
+
+def choose_cut_points(pauses, count):
+    """Picks the count longest pauses, or None when they cannot be told apart from the rest"""
+    if len(pauses) < count:
+        return None
+    ranked = sorted(pauses, key=lambda pause: pause[1] - pause[0], reverse=True)
+    if len(ranked) > count:
+        shortest_kept = ranked[count - 1][1] - ranked[count - 1][0]
+        longest_dropped = ranked[count][1] - ranked[count][0]
+        if shortest_kept < longest_dropped * 1.5:
+            return None
+    return sorted((start + end) // 2 for start, end in ranked[:count])
+
+def split_batches(plan):
+    """Splits each batched turn back into per-line files and returns the lines that could not be split"""
+    unsplit = []
+    for batch_file, group in plan["batches"]:
+        try:
+            audio = AudioSegment.from_wav(batch_file)
+        except Exception:
+            unsplit.extend(group)
+            continue
+
+        cuts = choose_cut_points(find_pauses(audio), len(group) - 1)
+        if cuts is None:
+            unsplit.extend(group)
+            continue
+
+        bounds = [0] + cuts + [len(audio)]
+        for i, start, end in zip(group, bounds, bounds[1:]):
+            trim_edge_silence(audio[start:end]).export(plan["line_files"][i], format="wav")
+    return unsplit
@@ -0,0 +1,79 @@
+# turn_validation.py
+
+import os
+from pydub import AudioSegment
+
+# Speech-rate model used to predict how long a turn should last. The bounds are
+# deliberately loose because turns may be narrated in a different language.
+CHARS_PER_SECOND = float(os.getenv('VALIDATION_CHARS_PER_SECOND', '14'))
+MIN_EXPECTED_SECONDS = 0.5
+MIN_DURATION_RATIO = float(os.getenv('VALIDATION_MIN_DURATION_RATIO', '0.35'))
+MAX_DURATION_RATIO = float(os.getenv('VALIDATION_MAX_DURATION_RATIO', '2.5'))
+DURATION_SLACK_SECONDS = 1.0
+
+# Level analysis configuration
+WINDOW_MS = 20
+SILENCE_THRESHOLD_DBFS = -45.0
+MAX_SILENCE_RATIO = float(os.getenv('VALIDATION_MAX_SILENCE_RATIO', '0.6'))
+CLIPPING_LEVEL = 32500
+MAX_CLIPPING_RATIO = float(os.getenv('VALIDATION_MAX_CLIPPING_RATIO', '0.02'))
+
+def expected_duration(text):
+    return max(len(text.strip()) / CHARS_PER_SECOND, MIN_EXPECTED_SECONDS)
+
+def score_turn(audio, text):
+    """Scores a turn's audio against its text and lists any defects found"""
+    expected_seconds = expected_duration(text)
+    actual_seconds = len(audio) / 1000.0
+
+    silent_windows = 0
+    clipped_windows = 0
+    total_windows = 0
+    for start in range(0, len(audio), WINDOW_MS):
+        window = audio[start:start + WINDOW_MS]
+        total_windows += 1
+        if window.rms == 0 or window.dBFS < SILENCE_THRESHOLD_DBFS:
+            silent_windows += 1
+        if window.max >= CLIPPING_LEVEL:
+            clipped_windows += 1
+
+    silence_ratio = silent_windows / total_windows if total_windows else 1.0
+    clipping_ratio = clipped_windows / total_windows if total_windows else 0.0
+    duration_ratio = actual_seconds / expected_seconds
+
+    defects = []
+    if duration_ratio < MIN_DURATION_RATIO:
+        defects.append("truncated")
+    elif actual_seconds > expected_seconds * MAX_DURATION_RATIO + DURATION_SLACK_SECONDS:
+        defects.append("too_long")
+    if silence_ratio > MAX_SILENCE_RATIO:
+        defects.append("silent")
+    if clipping_ratio > MAX_CLIPPING_RATIO:
+        defects.append("clipping")
+
+    return {
+        "expected_seconds": round(expected_seconds, 2),
+        "actual_seconds": round(actual_seconds, 2),
+        "duration_ratio": round(duration_ratio, 2),
+        "silence_ratio": round(silence_ratio, 3),
+        "clipping_ratio": round(clipping_ratio, 3),
+        "defects": defects,
+    }
+
+def score_turn_file(file_path, text):
+    if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+        return {"defects": ["missing"]}
+    try:
+        audio = AudioSegment.from_wav(file_path)
+    except Exception as e:
+        return {"defects": ["unreadable"], "error": str(e)}
+    return score_turn(audio, text)
+
+def find_defective_turns(lines, output_files):
+    """Returns (index, report) for every turn whose audio does not fit its text"""
+    defective = []
+    for i, (line, output_file) in enumerate(zip(lines, output_files)):
+        report = score_turn_file(output_file, line)
+        if report["defects"]:
+            defective.append((i, report))
+    return defective